@@ -11,6 +11,8 @@ class AppConfig:
     FILE_SIZE_THRESHOLD = 50
     TEMP_CLEANUP_HOURS = 1
     MAX_FILE_RETRIES = 2
+    HISTORY_LOAD_LIMIT = 100
+    HISTORY_FILTER_LIMIT = 500
     
     # File patterns
     RESULT_FILE_PATTERN = "{base}_*.json"
@@ -86,7 +86,7 @@ class ConnectionHandler:
             if not self.gui.validate_connection_fields():
                 return False
                 
-            if not self.ssh_connection.is_connected():
+            if not self.ssh_connection.ping():
                 hostname = self.gui.lan_ip_var.get()
                 username = self.gui.username_var.get()
                 password = self.gui.password_var.get()
@@ -108,7 +108,7 @@ class ConnectionHandler:
             
             # Verify config path exists
             cmd_config = f"test -d {config_path} && echo 'exists' || echo 'missing'"
-            success, output, _ = self.ssh_connection.execute_command(cmd_config)
+            success, output, _ = self.ssh_connection.execute_command(cmd_config, idempotent=True)
             config_exists = success and output.strip() == "exists"
             
             if not config_exists:
@@ -124,7 +124,7 @@ class ConnectionHandler:
             
             # Verify result path exists
             cmd_result = f"test -d {result_path} && echo 'exists' || echo 'missing'"
-            success, output, _ = self.ssh_connection.execute_command(cmd_result)
+            success, output, _ = self.ssh_connection.execute_command(cmd_result, idempotent=True)
             result_exists = success and output.strip() == "exists"
             
             if not result_exists:
@@ -164,7 +164,7 @@ class ConnectionHandler:
                 return []
                 
             cmd = f"ls -la {remote_dir} 2>/dev/null || echo 'Error: Directory not found'"
-            success, output, _ = self.ssh_connection.execute_command(cmd)
+            success, output, _ = self.ssh_connection.execute_command(cmd, idempotent=True)
             
             if not success or "Error:" in output:
                 self.gui.log_error(f"Failed to list directory {remote_dir}")
@@ -18,6 +18,8 @@ class FileProcessor:
         self.gui = gui
         self.ssh_connection = gui.ssh_connection
         self.database = gui.database
+        # Local path -> remote path in the staging directory, for files uploaded ahead of their turn
+        self._staged: Dict[str, str] = {}
     
     def send_files(self):
         """Send selected files to the remote device for processing"""
@@ -68,6 +70,9 @@ class FileProcessor:
             # Reset progress bar
             self.gui.root.after(0, lambda: self.gui.progress_var.set(0))
             
+            # Gửi trước tất cả các file vào thư mục tạm, mỗi file chỉ cần mv khi đến lượt
+            self._staged = self._stage_files(file_paths)
+            
             for i, file_path in enumerate(file_paths):
                 # Update current file index for status reporting
                 self.gui.current_file_index = i
@@ -140,9 +145,60 @@ class FileProcessor:
         except Exception as e:
             self.gui.log_error(f"Lỗi trong quá trình xử lý file: {str(e)}")
         finally:
+            self._discard_staged()
             self.gui.processing = False
             self.gui.current_file_index = -1
     
+    def _staging_dir(self) -> str:
+        """Hidden directory inside the config directory; the device only picks up files
+        placed directly in the config directory, and a rename within it is atomic"""
+        return os.path.join(self.gui.config_path_var.get(), ".staging").replace('\\', '/')
+    
+    def _stage_files(self, file_paths: List[str]) -> Dict[str, str]:
+        """Upload every selected file to the staging directory in one concurrent batch.
+        Returns local path -> staged remote path for the files that were uploaded."""
+        staging_dir = self._staging_dir()
+        pairs = []
+        seen_names = set()
+        for file_path in file_paths:
+            file_name = os.path.basename(file_path)
+            # Same name twice would overwrite the staged copy; the later one is sent on its turn
+            if file_name not in seen_names:
+                seen_names.add(file_name)
+                pairs.append((file_path, f"{staging_dir}/{file_name}"))
+        
+        try:
+            results = self.ssh_connection.upload_files(pairs)
+        except Exception as e:
+            self.gui.log_file(f"Không gửi trước được các file, sẽ gửi từng file: {str(e)}")
+            return {}
+        
+        staged = {local_path: remote_path for (local_path, remote_path), ok in zip(pairs, results) if ok}
+        self.gui.log_file(f"Staged {len(staged)}/{len(file_paths)} files on the device")
+        return staged
+    
+    def _upload_test_file(self, file_path: str, remote_path: str) -> bool:
+        """Put a test file in the config directory: move its staged copy if there is one,
+        otherwise upload it"""
+        remote_path = remote_path.replace('\\', '/')
+        staged_path = self._staged.pop(file_path, None)
+        if staged_path:
+            success, _, stderr = self.ssh_connection.execute_command(f"mv -f '{staged_path}' '{remote_path}'")
+            if success:
+                return True
+            self.gui.log_file(f"Không chuyển được file đã gửi trước ({stderr.strip()}), gửi lại...")
+        
+        return self.ssh_connection.upload_file(file_path, remote_path)
+    
+    def _discard_staged(self):
+        """Remove the staging directory, including files never reached (cancel or error)"""
+        self._staged = {}
+        try:
+            if self.ssh_connection.is_connected():
+                self.ssh_connection.execute_command(f"rm -rf '{self._staging_dir()}'")
+        except Exception as e:
+            self.gui.log_error(f"Không xóa được thư mục tạm: {str(e)}")
+    
     def _process_single_file(self, file_index, file_path, file_start_time):
         """Process a single file with special handling for network-affecting tests"""
         file_name = os.path.basename(file_path)
@@ -193,7 +249,7 @@ class FileProcessor:
                 
                 # Upload file
                 remote_path = os.path.join(self.gui.config_path_var.get(), file_name)
-                upload_success = self.ssh_connection.upload_file(file_path, remote_path)
+                upload_success = self._upload_test_file(file_path, remote_path)
                 
                 if not upload_success:
                     raise Exception("File upload failed")
@@ -293,9 +349,11 @@ class FileProcessor:
                         pattern = f"{base_name}_*.json"
                         self.gui.log_result(f"Tìm kiếm file kết quả cho {file_name}...")
                         
-                        # Tìm file kết quả mới nhất sau khi upload
+                        # Tìm file kết quả mới nhất và các file tạo sau khi upload cùng lúc (một round trip)
                         cmd = f"ls -lt {result_dir}/{pattern} 2>/dev/null | head -1"
-                        success, newest_file_info, _ = self.ssh_connection.execute_command(cmd)
+                        cmd_check = f"find {result_dir} -name '{pattern}' -type f -newermt \"$(date -d @{int(upload_time)} '+%Y-%m-%d %H:%M:%S')\""
+                        (success, newest_file_info, _), (check_success, check_output, _) = \
+                            self.ssh_connection.execute_commands_parallel([cmd, cmd_check])
                         
                         if success and newest_file_info.strip():
                             # Trích xuất tên file từ kết quả command ls
@@ -304,10 +362,7 @@ class FileProcessor:
                             result_file_path = os.path.join(result_dir, newest_file)
                             
                             # Kiểm tra file được tạo sau khi upload
-                            cmd_check = f"find {result_dir} -name '{pattern}' -type f -newermt \"$(date -d @{int(upload_time)} '+%Y-%m-%d %H:%M:%S')\" | grep '{newest_file}'"
-                            check_success, check_output, _ = self.ssh_connection.execute_command(cmd_check)
-                            
-                            if check_success and check_output.strip():
+                            if check_success and newest_file in check_output:
                                 self.gui.log_result(f"Tìm thấy file kết quả: {newest_file}")
                                 
                                 # Tải xuống và xử lý kết quả
@@ -393,7 +448,7 @@ class FileProcessor:
         self.gui.log_result(f"Searching for result files matching {pattern}")
         
         cmd = f"find {self.gui.result_path_var.get()} -name '{pattern}' -type f -newermt \"$(date -d @{int(pre_test_time)} '+%Y-%m-%d %H:%M:%S')\" | sort | tail -1"
-        success, output, _ = self.ssh_connection.execute_command(cmd)
+        success, output, _ = self.ssh_connection.execute_command(cmd, idempotent=True)
         
         if not success or not output.strip():
             raise Exception(f"No result file found after reconnect")
@@ -511,33 +566,35 @@ class FileProcessor:
             affects_wan = impacts.get("affects_wan", False)
             affects_lan = impacts.get("affects_lan", False)
             
-            # Save result to database
-            result_id = self.gui.database.save_test_file_result(
-                file_name=file_name,
-                file_size=file_size,
-                test_count=test_count,
-                send_status="Complete",
-                overall_result=overall_result,
-                affects_wan=affects_wan,
-                affects_lan=affects_lan,
-                execution_time=execution_time,
-                target_ip=self.gui.lan_ip_var.get(),
-                target_username=self.gui.username_var.get()
-            )
-            
-            # If test cases exist, save them too
-            if test_cases:
-                self.gui.database.save_test_case_results(result_id, test_cases)
-            else:
-                # Create synthetic test case from overall result
-                synthetic_case = {
+            # Save the parsed test cases, or a synthetic one from the overall result;
+            # test_cases itself is left as parsed for the detail table below
+            cases_to_save = test_cases
+            if not cases_to_save:
+                cases_to_save = [{
                     "service": result_data.get("service", "unknown"),
                     "action": result_data.get("action", ""),
                     "status": "pass" if "Pass" in overall_result else "fail",
                     "details": result_data.get("details", ""),
                     "execution_time": execution_time
-                }
-                self.gui.database.save_test_case_results(result_id, [synthetic_case])
+                }]
+            
+            # Save result and its test cases to database in one transaction
+            self.gui.database.save_test_run(
+                {
+                    "file_name": file_name,
+                    "file_size": file_size,
+                    "test_count": test_count,
+                    "send_status": "Complete",
+                    "overall_result": overall_result,
+                    "affects_wan": affects_wan,
+                    "affects_lan": affects_lan,
+                    "execution_time": execution_time,
+                    "target_ip": self.gui.lan_ip_var.get(),
+                    "target_username": self.gui.username_var.get()
+                },
+                cases_to_save
+            )
+            self.gui.mark_history_dirty()
             
             # Update UI
             self.gui.update_file_status(file_index, "Complete", overall_result, time_str)
@@ -545,8 +602,9 @@ class FileProcessor:
             # Display result details
             if hasattr(self.gui, 'detail_table'):
                 # Clear existing details
-                for item in self.gui.detail_table.get_children():
-                    self.gui.detail_table.delete(item)
+                children = self.gui.detail_table.get_children()
+                if children:
+                    self.gui.detail_table.delete(*children)
                     
                 # Add test case information
                 if not test_cases:
@@ -556,21 +614,16 @@ class FileProcessor:
                     status = overall_result
                     details = result_data.get("details", "")
                     
-                    item_id = self.gui.detail_table.insert("", "end", values=(
+                    # Add color based on status
+                    tag = "pass" if "Pass" in status else ("fail" if "Fail" in status else "")
+                    
+                    self.gui.detail_table.insert("", "end", values=(
                         service,
                         action,
                         "",  # parameters
                         status,
                         details
-                    ))
-                    
-                    # Add color based on status
-                    if "Pass" in status:
-                        self.gui.detail_table.tag_configure("pass", background="#e8f5e9")
-                        self.gui.detail_table.item(item_id, tags=("pass",))
-                    elif "Fail" in status:
-                        self.gui.detail_table.tag_configure("fail", background="#ffebee")
-                        self.gui.detail_table.item(item_id, tags=("fail",))
+                    ), tags=(tag,) if tag else ())
                 else:
                     for result in test_cases:
                         service = result.get("service", "")
@@ -582,21 +635,17 @@ class FileProcessor:
                         # Format status
                         status_text = status.capitalize()
                         
-                        item_id = self.gui.detail_table.insert("", "end", values=(
+                        # Add color based on status
+                        status_lower = status.lower()
+                        tag = "pass" if status_lower == "pass" else ("fail" if status_lower == "fail" else "")
+                        
+                        self.gui.detail_table.insert("", "end", values=(
                             service,
                             action,
                             parameters,
                             status_text,
                             details
-                        ))
-                        
-                        # Add color based on status
-                        if status.lower() == "pass":
-                            self.gui.detail_table.tag_configure("pass", background="#e8f5e9")
-                            self.gui.detail_table.item(item_id, tags=("pass",))
-                        elif status.lower() == "fail":
-                            self.gui.detail_table.tag_configure("fail", background="#ffebee")
-                            self.gui.detail_table.item(item_id, tags=("fail",))
+                        ), tags=(tag,) if tag else ())
             
             self.gui.log_result(f"File {file_name} processed successfully: {overall_result}")
             return True
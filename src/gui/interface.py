@@ -46,6 +46,7 @@ class ApplicationGUI:
         self.ssh_connection = SSHConnection()
         self.file_manager = TestFileManager()
         self.database = TestDatabase()
+        self.ssh_connection.shared_mount_map = self._load_shared_mount_map()
         
         # Setup variables and state first
         self.setup_variables()
@@ -63,6 +64,7 @@ class ApplicationGUI:
         self.create_menu()
         self.create_notebook()
         self.create_status_bar()
+        self.utils.bind_widgets()
         
         # Load history and setup auto-save
         self.load_history()
@@ -108,6 +110,25 @@ class ApplicationGUI:
         self.status_summary = tk.StringVar(value="Ready")
         self.log_level_var = tk.StringVar(value="All")
     
+    def _load_shared_mount_map(self) -> Dict[str, str]:
+        """Read the remote-prefix -> local-share map from the shared_mount_map setting.
+        
+        The setting is a JSON object, e.g. {"/mnt/share": "\\\\nas\\share"}; empty disables the feature.
+        """
+        raw = self.database.get_setting("shared_mount_map", "")
+        if not raw:
+            return {}
+        try:
+            mapping = json.loads(raw)
+            if not isinstance(mapping, dict) or not all(
+                isinstance(k, str) and isinstance(v, str) for k, v in mapping.items()
+            ):
+                raise ValueError("expected a JSON object of remote prefix -> local path strings")
+            return mapping
+        except ValueError as e:
+            self.logger.warning(f"Ignoring invalid shared_mount_map setting: {e}")
+            return {}
+    
     def setup_auto_save(self):
         """Setup auto-save for settings when they change"""
         def save_setting(var_name, var):
@@ -136,8 +157,25 @@ class ApplicationGUI:
         self.root.after(300000, cleanup_task)  # Start after 5 minutes
     
     # Enhanced logging methods
-    def log_message(self, message: str, log_type: str = "INFO"):
-        """Add a message to the log with timestamp and proper formatting"""
+    def log_message(self, message: str, *args, log_type: str = "INFO"):
+        """Add a message to the log with timestamp and proper formatting.
+        
+        Extra args are %-formatted into message, as with the logging module.
+        """
+        # Debug messages are dropped before any formatting unless debug mode is on
+        if log_type == "DEBUG" and not self.debug_mode:
+            return
+        
+        # Log ra logger chính thức trước - logger tự format khi cần
+        if log_type == "ERROR":
+            self.logger.error(message, *args)
+        elif log_type == "DEBUG":
+            self.logger.debug(message, *args)
+        else:
+            self.logger.info(message, *args)
+        
+        if args:
+            message = message % args
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         
         # Định dạng dựa trên loại log
@@ -154,14 +192,6 @@ class ApplicationGUI:
         else:
             formatted_msg = f"[{timestamp}] ℹ️ INFO: {message}"
         
-        # Log ra logger chính thức trước
-        if log_type == "ERROR":
-            self.logger.error(message)
-        elif log_type == "DEBUG":
-            self.logger.debug(message)
-        else:
-            self.logger.info(message)
-        
         # Sau đó kiểm tra xem log_text đã được tạo chưa
         log_entry = formatted_msg + "\n"
         
@@ -172,69 +202,32 @@ class ApplicationGUI:
                 log_text.insert(tk.END, log_entry)
                 log_text.see(tk.END)
             except Exception as e:
-                self.logger.error(f"Error writing to log display: {e}")
+                self.logger.error("Error writing to log display: %s", e)
 
-    def log_connection(self, message: str):
+    def log_connection(self, message: str, *args):
         """Log connection related message"""
-        self.log_message(message, "CONNECTION")
+        self.log_message(message, *args, log_type="CONNECTION")
         
-    def log_file(self, message: str):
+    def log_file(self, message: str, *args):
         """Log file operation related message"""
-        self.log_message(message, "FILE")
+        self.log_message(message, *args, log_type="FILE")
         
-    def log_result(self, message: str):
+    def log_result(self, message: str, *args):
         """Log test result related message"""
-        self.log_message(message, "RESULT")
+        self.log_message(message, *args, log_type="RESULT")
         
-    def log_error(self, message: str):
+    def log_error(self, message: str, *args):
         """Log error message"""
-        self.log_message(message, "ERROR")
+        self.log_message(message, *args, log_type="ERROR")
         
-    def log_debug(self, message: str):
+    def log_debug(self, message: str, *args):
         """Log debug message - only shown in debug mode"""
-        if self.debug_mode:
-            self.log_message(message, "DEBUG")
+        self.log_message(message, *args, log_type="DEBUG")
     
     def filter_logs(self):
         """Filter logs based on selected log level"""
-        # Sử dụng getattr để kiểm tra an toàn
-        log_text = getattr(self, 'log_text', None)
-        log_level_var = getattr(self, 'log_level_var', None)
-        
-        if log_text is None or log_level_var is None:
-            self.logger.warning("Log text or level variable not initialized yet")
-            return
-            
-        selected_level = log_level_var.get()
-        
-        if selected_level == "All":
-            return  # No filtering needed
-        
-        # Map level name to emoji/prefix
-        level_prefix = {
-            "Connection": "🔌 CONNECTION:",
-            "File": "📄 FILE:",
-            "Result": "✅ RESULT:",
-            "Error": "❌ ERROR:",
-            "Debug": "🔍 DEBUG:",
-        }
-        
-        try:
-            # Get current log content
-            log_content = log_text.get("1.0", tk.END)
-            
-            # Clear current content
-            log_text.delete("1.0", tk.END)
-            
-            # Filter and re-insert relevant lines
-            for line in log_content.splitlines():
-                if level_prefix.get(selected_level, "") in line:
-                    log_text.insert(tk.END, line + "\n")
-            
-            # Scroll to end
-            log_text.see(tk.END)
-        except Exception as e:
-            self.logger.error(f"Error filtering logs: {e}")
+        self.utils.filter_logs()
+    
     def test_connection(self):
         """Test connection using connection handler"""
         self.connection_handler.test_connection()
@@ -324,6 +317,10 @@ class ApplicationGUI:
         """Clear history with confirmation"""
         self.utils.clear_history()
     
+    def mark_history_dirty(self):
+        """Mark history as changed after a database write"""
+        self.utils.mark_history_dirty()
+    
     def refresh_view(self):
         """Refresh all views"""
         self.utils.refresh_view()
@@ -418,12 +415,14 @@ class ApplicationGUI:
             else:
                 self.processing = False
                 self.ssh_connection.disconnect()
+                self.database.close()
                 self.logger.info("Application closed by user (immediate)")
                 self.root.destroy()
                 return
         
         try:
             self.ssh_connection.disconnect()
+            self.database.close()
             self.logger.info(f"Application closed normally by {os.environ.get('USERNAME', 'unknown')}")
         except Exception as e:
             self.logger.warning(f"Error during cleanup: {e}")
@@ -33,14 +33,14 @@ class ResultHandler:
         
         # Get initial files
         cmd = f"find {result_dir} -name '{pattern}' -type f 2>/dev/null || echo ''"
-        success, initial_files_str, _ = self.ssh_connection.execute_command(cmd)
+        success, initial_files_str, _ = self.ssh_connection.execute_command(cmd, idempotent=True)
         initial_files = set(initial_files_str.strip().split('\n') if initial_files_str.strip() else [])
         
         # Log initial state
-        self.gui.log_debug(f"Initial file count: {len(initial_files)}")
+        self.gui.log_debug("Initial file count: %d", len(initial_files))
         if initial_files:
             sample_files = sorted(list(initial_files))[-3:]  # Get last 3 files
-            self.gui.log_debug(f"Initial files: {', '.join([os.path.basename(f) for f in sample_files])}")
+            self.gui.log_debug("Initial files: %s", ', '.join(os.path.basename(f) for f in sample_files))
         
         # Get timestamp of the latest existing file for the test
         latest_timestamp = None
@@ -52,7 +52,7 @@ class ResultHandler:
                 parts = file_name.split('_')
                 if len(parts) >= 3:
                     latest_timestamp = f"{parts[-2]}_{parts[-1].split('.')[0]}"
-                    self.gui.log_debug(f"Latest existing file timestamp: {latest_timestamp}")
+                    self.gui.log_debug("Latest existing file timestamp: %s", latest_timestamp)
             except Exception as e:
                 self.gui.log_error(f"Error extracting timestamp: {str(e)}")
         
@@ -88,7 +88,7 @@ class ResultHandler:
                 
                 # Look for newer files - use ls with timestamp sorting
                 cmd = f"ls -lt {result_dir}/{pattern} 2>/dev/null | head -1"
-                success, newest_file_info, _ = self.ssh_connection.execute_command(cmd)
+                success, newest_file_info, _ = self.ssh_connection.execute_command(cmd, idempotent=True)
                 
                 if not success or not newest_file_info.strip():
                     time.sleep(check_interval)
@@ -113,7 +113,7 @@ class ResultHandler:
                         # Compare with latest timestamp from initial scan
                         if latest_timestamp and timestamp_in_name > latest_timestamp:
                             is_new_file = True
-                            self.gui.log_debug(f"Found newer timestamp: {timestamp_in_name} > {latest_timestamp}")
+                            self.gui.log_debug("Found newer timestamp: %s > %s", timestamp_in_name, latest_timestamp)
                 except Exception:
                     pass
                     
@@ -159,14 +159,14 @@ class ResultHandler:
         try:
             # Check if file exists
             cmd = f"test -f {file_path} && echo 'exists' || echo 'missing'"
-            success, output, _ = self.ssh_connection.execute_command(cmd)
+            success, output, _ = self.ssh_connection.execute_command(cmd, idempotent=True)
             
             if not success or output.strip() != "exists":
                 return False
             
             # Check if file size is stable (not currently being written)
             size1_cmd = f"stat -c %s {file_path}"
-            success1, size1, _ = self.ssh_connection.execute_command(size1_cmd)
+            success1, size1, _ = self.ssh_connection.execute_command(size1_cmd, idempotent=True)
             
             if not success1 or not size1.strip():
                 return False
@@ -174,7 +174,7 @@ class ResultHandler:
             time.sleep(1)
             
             size2_cmd = f"stat -c %s {file_path}"
-            success2, size2, _ = self.ssh_connection.execute_command(size2_cmd)
+            success2, size2, _ = self.ssh_connection.execute_command(size2_cmd, idempotent=True)
             
             if not success2 or size1.strip() != size2.strip():
                 return False
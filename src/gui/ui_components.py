@@ -206,6 +206,10 @@ class UIComponents:
         self.gui.detail_table.column("status", width=80)
         self.gui.detail_table.column("details", width=300)
         
+        # Row colors by test status
+        self.gui.detail_table.tag_configure("pass", background="#e8f5e9")
+        self.gui.detail_table.tag_configure("fail", background="#ffebee")
+        
         # Add scrollbar
         detail_scrollbar = ttk.Scrollbar(detail_frame, orient=tk.VERTICAL, command=self.gui.detail_table.yview)
         self.gui.detail_table.configure(yscrollcommand=detail_scrollbar.set)
@@ -324,6 +328,8 @@ class UIComponents:
         
         # Text widget for logs
         self.gui.log_text = tk.Text(log_frame, wrap=tk.WORD, height=10)
+        # Lines filtered out by level are elided rather than deleted
+        self.gui.log_text.tag_configure("hidden", elide=True)
         self.gui.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         # Configure scrollbar
@@ -418,15 +424,17 @@ class UIComponents:
     
     def clear_files(self):
         """Clear all selected files"""
-        for item in self.gui.file_table.get_children():
-            self.gui.file_table.delete(item)
+        children = self.gui.file_table.get_children()
+        if children:
+            self.gui.file_table.delete(*children)
             
         self.gui.selected_files = []
         self.gui.file_data = {}
         
         # Clear detail table
-        for item in self.gui.detail_table.get_children():
-            self.gui.detail_table.delete(item)
+        children = self.gui.detail_table.get_children()
+        if children:
+            self.gui.detail_table.delete(*children)
             
         self.gui.log_file("File selection cleared")
     
@@ -490,8 +498,9 @@ class UIComponents:
         test_cases = file_data.get("test_cases", [])
         
         # Clear detail table
-        for item in self.gui.detail_table.get_children():
-            self.gui.detail_table.delete(item)
+        children = self.gui.detail_table.get_children()
+        if children:
+            self.gui.detail_table.delete(*children)
             
         # Add test cases to detail table
         if test_cases:
@@ -560,6 +569,20 @@ class UIComponents:
         timeout_entry = ttk.Entry(timeout_frame, textvariable=timeout_var, width=5)
         timeout_entry.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
         
+        # Shared mount map: JSON {"remote prefix": "local share path"}, uploads under
+        # a mapped prefix are copied straight onto the share
+        ttk.Label(timeout_frame, text="Shared mounts (JSON):").grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
+        mount_var = tk.StringVar(value=self.gui.database.get_setting("shared_mount_map", ""))
+        mount_entry = ttk.Entry(timeout_frame, textvariable=mount_var, width=40)
+        mount_entry.grid(row=1, column=1, sticky=tk.W, padx=5, pady=5)
+        
+        def save_settings():
+            AppConfig.DEFAULT_TIMEOUT = timeout_var.get()
+            self.gui.database.save_setting("shared_mount_map", mount_var.get().strip())
+            self.gui.ssh_connection.shared_mount_map = self.gui._load_shared_mount_map()
+            settings_dialog.destroy()
+            self.gui.log_message("Settings updated")
+        
         # Buttons
         button_frame = ttk.Frame(settings_dialog)
         button_frame.pack(fill=tk.X, padx=10, pady=10)
@@ -567,11 +590,7 @@ class UIComponents:
         ttk.Button(
             button_frame,
             text="Save",
-            command=lambda: [
-                setattr(AppConfig, 'DEFAULT_TIMEOUT', timeout_var.get()),
-                settings_dialog.destroy(),
-                self.gui.log_message("Settings updated")
-            ]
+            command=save_settings
         ).pack(side=tk.RIGHT, padx=5)
         
         ttk.Button(
@@ -7,19 +7,172 @@
 
 import os
 import time
+import types
+import queue
 import datetime
 import csv
+import sqlite3
+import threading
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
+from storage.database import apply_perf_pragmas
 from .config import AppConfig
 
+_strptime = datetime.datetime.strptime
+
+# Current user shown in the About dialog; fixed for the process lifetime
+_USERNAME = os.environ.get('USERNAME', 'unknown')
+
+# Connection status circle colors
+_STATUS_COLORS = {
+    "green": "#00AA00",
+    "yellow": "#FFB000",
+    "red": "#CC0000",
+    "gray": "#808080"
+}
+
+# Temporary result files removed by cleanup_temp_files
+_TEMP_SUFFIX = (".json",)
+
+# CSV export write buffer: 1 MiB of memory per open export in exchange for far fewer write syscalls
+_EXPORT_BUFFER_SIZE = 1 << 20
+
+# CSV export header and the detail fields written under it, in the same order
+_EXPORT_HEADER = ('Service', 'Action', 'Status', 'Details', 'Execution Time (s)')
+
+def _export_row(detail):
+    """Positional CSV row for one test detail; missing keys fall back to empty/zero"""
+    get = detail.get
+    status = get("status", "")
+    return (
+        get("service", ""),
+        get("action", ""),
+        status.capitalize() if status else "",
+        get("details", ""),
+        f"{get('execution_time', 0) or 0:.2f}"
+    )
+
+# Columns read for the history table, in the positional order used by the display loops
+HISTORY_COLUMNS = (
+    "timestamp", "file_name", "test_count", "overall_result",
+    "execution_time", "affects_wan", "affects_lan"
+)
+
+# History date filters -> timestamp condition, and day ranges for the relative ones
+_DATE_CONDITIONS = {
+    "All": "",
+    "Today": "timestamp LIKE ?",
+    "Last 7 Days": "timestamp >= ?",
+    "Last 30 Days": "timestamp >= ?"
+}
+_DATE_RANGE_DAYS = {
+    "Last 7 Days": 7,
+    "Last 30 Days": 30
+}
+
+# Log level name -> line prefix written by the log_* helpers
+_LEVEL_PREFIX = types.MappingProxyType({
+    "Connection": "🔌 CONNECTION:",
+    "File": "📄 FILE:",
+    "Result": "✅ RESULT:",
+    "Error": "❌ ERROR:",
+    "Debug": "🔍 DEBUG:",
+})
+
 class GUIUtils:
+    # Múi giờ địa phương (UTC+7)
+    LOCAL_OFFSET = datetime.timedelta(hours=7)
+    
     def __init__(self, gui):
         self.gui = gui
         self.database = gui.database
         self.logger = gui.logger
         # Don't reference other handlers during initialization
         
+        # Persistent history connection, reused by every history refresh
+        self._conn = sqlite3.connect("data/history.db", check_same_thread=False)
+        apply_perf_pragmas(self._conn)
+        self._table_name, self._col_idx = self._discover_schema()
+        
+        # Pre-format history queries once the table name is known; columns missing
+        # from an older schema are selected as NULL so row positions never shift
+        select_list = ", ".join(map(self._history_column_expr, HISTORY_COLUMNS))
+        self._filter_select = f"SELECT {select_list} FROM {self._table_name}"
+        self._history_query = f"{self._filter_select} ORDER BY timestamp DESC LIMIT {AppConfig.HISTORY_LOAD_LIMIT}"
+        self._filter_queries = self._build_filter_queries()
+        
+        # Widget handles, resolved by bind_widgets() once the UI is built
+        self.file_table = None
+        self.history_table = None
+        self.detail_table = None
+        
+        # Last filter shown in the history table; cleared whenever the table changes
+        self._last_filter_key = None
+        self._history_dirty = True
+        
+        # History queries run on a worker thread and hand rows back through a queue
+        self._db_lock = threading.Lock()
+        self._history_queue = queue.Queue()
+        self._history_job = 0
+        self._history_polling = False
+        # Close the shared connection once the main window goes away
+        self.gui.root.bind("<Destroy>", self._on_root_destroy, add="+")
+        
+        # File status updates are coalesced and flushed on the Tk thread
+        self._pending_updates = {}
+        self._pending_lock = threading.Lock()
+        self.gui.root.after(50, self._flush_updates)
+    
+    def bind_widgets(self):
+        """Cache table widget handles after the GUI has been constructed"""
+        self.file_table = getattr(self.gui, 'file_table', None)
+        self.history_table = getattr(self.gui, 'history_table', None)
+        self.detail_table = getattr(self.gui, 'detail_table', None)
+    
+    def _on_root_destroy(self, event):
+        """Close the shared history connection when the root window is destroyed"""
+        # <Destroy> on the root also fires for every child widget
+        if event.widget is not self.gui.root:
+            return
+        with self._db_lock:
+            try:
+                self._conn.close()
+            except Exception as e:
+                self.logger.error("Error closing history database: %s", e)
+    
+    def _history_column_expr(self, name):
+        """SELECT expression for one HISTORY_COLUMNS entry under the discovered schema"""
+        if name == "execution_time" and "execution_time_us" in self._col_idx:
+            # TestDatabase stores execution time as integer microseconds
+            return "execution_time_us / 1000000.0 AS execution_time"
+        return name if name in self._col_idx else f"NULL AS {name}"
+    
+    def _discover_schema(self):
+        """Find the history table and map its column names to indexes"""
+        try:
+            cursor = self._conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            tables = [t[0] for t in cursor.fetchall()]
+            self.gui.log_debug("Database tables: %s", ', '.join(tables))
+            
+            # Chọn bảng phù hợp
+            if "test_results" in tables:
+                table_name = "test_results"
+            elif "test_file_results" in tables:
+                table_name = "test_file_results"
+            else:
+                return None, {}
+            
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            columns = [c[1] for c in cursor.fetchall()]
+            self.gui.log_debug("Table %s columns: %s", table_name, ', '.join(columns))
+            
+            return table_name, {name: i for i, name in enumerate(columns)}
+            
+        except Exception as e:
+            self.logger.error("Error discovering history schema: %s", e)
+            return None, {}
+        
     def cleanup_temp_files(self):
         """Clean up old temporary result files"""
         temp_dir = "data/temp/results"
@@ -30,18 +183,17 @@ class GUIUtils:
         cleaned_count = 0
         
         try:
-            for file in os.listdir(temp_dir):
-                if file.endswith('.json'):
-                    file_path = os.path.join(temp_dir, file)
-                    if os.path.getctime(file_path) < cutoff_time:
-                        os.remove(file_path)
+            with os.scandir(temp_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(_TEMP_SUFFIX) and entry.stat().st_ctime < cutoff_time:
+                        os.remove(entry.path)
                         cleaned_count += 1
             
             if cleaned_count > 0:
-                self.gui.log_debug(f"Cleaned up {cleaned_count} old temporary files")
+                self.gui.log_debug("Cleaned up %d old temporary files", cleaned_count)
                 
         except Exception as e:
-            self.gui.log_error(f"Cleanup failed: {e}")
+            self.gui.log_error("Cleanup failed: %s", e)
     
     def validate_connection_fields(self) -> bool:
         """Validate connection fields"""
@@ -61,46 +213,50 @@ class GUIUtils:
     
     def update_status_circle(self, color: str):
         """Update connection status circle color"""
-        color_mapping = {
-            "green": "#00AA00",
-            "yellow": "#FFB000", 
-            "red": "#CC0000",
-            "gray": "#808080"
-        }
-        
-        actual_color = color_mapping.get(color, color)
-        if hasattr(self.gui, 'status_canvas') and hasattr(self.gui, 'status_circle'):
-            self.gui.status_canvas.itemconfig(self.gui.status_circle, fill=actual_color)
+        actual_color = _STATUS_COLORS.get(color, color)
+        canvas = getattr(self.gui, 'status_canvas', None)
+        circle = getattr(self.gui, 'status_circle', None)
+        if canvas is not None and circle is not None:
+            canvas.itemconfig(circle, fill=actual_color)
     
     def update_file_status(self, file_index: int, status: str, result: str = "", time_str: str = ""):
-        """Update file status in the table"""
+        """Queue a file status update for the table"""
+        with self._pending_lock:
+            changes = self._pending_updates.setdefault(file_index, {})
+            changes["status"] = status
+            if result:
+                changes["result"] = result
+            if time_str:
+                changes["time"] = time_str
+    
+    def _flush_updates(self):
+        """Apply queued file status updates, touching only the changed columns"""
         try:
-            if not hasattr(self.gui, 'file_table'):
-                return
-            
-            items = self.gui.file_table.get_children()
-            if file_index < len(items):
-                item_id = items[file_index]
-                current_values = list(self.gui.file_table.item(item_id)["values"])
-                current_values[3] = status  # Status column
-                if result:
-                    current_values[4] = result  # Result column
-                if time_str:
-                    current_values[5] = time_str  # Time column
-                
-                self.gui.root.after(0, lambda: self.gui.file_table.item(item_id, values=tuple(current_values)))
+            with self._pending_lock:
+                pending, self._pending_updates = self._pending_updates, {}
+            
+            if pending and self.file_table is not None:
+                items = self.file_table.get_children()
+                for file_index, changes in pending.items():
+                    if file_index < len(items):
+                        item_id = items[file_index]
+                        for column, value in changes.items():
+                            self.file_table.set(item_id, column, value)
         except Exception as e:
-            self.gui.log_error(f"Error updating file status: {e}")
+            self.gui.log_error("Error updating file status: %s", e)
+        finally:
+            self.gui.root.after(50, self._flush_updates)
     
     def update_detail_table_with_results(self, file_index: int, result_data: dict):
         """Update detail table with test results"""
         try:
-            if not hasattr(self.gui, 'detail_table'):
+            if self.detail_table is None:
                 return
             
             # Clear existing details
-            for item in self.gui.detail_table.get_children():
-                self.gui.detail_table.delete(item)
+            children = self.detail_table.get_children()
+            if children:
+                self.detail_table.delete(*children)
                 
             # Add results if available
             test_results = result_data.get("test_results", [])
@@ -112,21 +268,16 @@ class GUIUtils:
                 status = result_data.get("overall_result", "Unknown")
                 details = result_data.get("details", "")
                 
-                item_id = self.gui.detail_table.insert("", "end", values=(
+                # Add color based on status
+                tag = "pass" if "Pass" in status else ("fail" if "Fail" in status else "")
+                
+                self.detail_table.insert("", "end", values=(
                     service,
                     action,
                     "",  # parameters
                     status,
                     details
-                ))
-                
-                # Add color based on status
-                if "Pass" in status:
-                    self.gui.detail_table.tag_configure("pass", background="#e8f5e9")
-                    self.gui.detail_table.item(item_id, tags=("pass",))
-                elif "Fail" in status:
-                    self.gui.detail_table.tag_configure("fail", background="#ffebee")
-                    self.gui.detail_table.item(item_id, tags=("fail",))
+                ), tags=(tag,) if tag else ())
                     
                 return
                 
@@ -140,32 +291,32 @@ class GUIUtils:
                 # Format status
                 status_text = status.capitalize()
                 
-                item_id = self.gui.detail_table.insert("", "end", values=(
+                # Add color based on status
+                status_lower = status.lower()
+                tag = "pass" if status_lower == "pass" else ("fail" if status_lower == "fail" else "")
+                
+                self.detail_table.insert("", "end", values=(
                     service,
                     action,
                     parameters,
                     status_text,
                     details
-                ))
-                
-                # Add color based on status
-                if status.lower() == "pass":
-                    self.gui.detail_table.tag_configure("pass", background="#e8f5e9")
-                    self.gui.detail_table.item(item_id, tags=("pass",))
-                elif status.lower() == "fail":
-                    self.gui.detail_table.tag_configure("fail", background="#ffebee")
-                    self.gui.detail_table.item(item_id, tags=("fail",))
+                ), tags=(tag,) if tag else ())
                 
         except Exception as e:
-            self.gui.log_error(f"Error updating detail table: {str(e)}")
+            self.gui.log_error("Error updating detail table: %s", e)
     
     def save_config(self):
         """Save configuration"""
         try:
-            self.database.save_setting("lan_ip", self.gui.lan_ip_var.get())
-            self.database.save_setting("username", self.gui.username_var.get())
-            self.database.save_setting("config_path", self.gui.config_path_var.get())
-            self.database.save_setting("result_path", self.gui.result_path_var.get())
+            saved = self.database.save_settings({
+                "lan_ip": self.gui.lan_ip_var.get(),
+                "username": self.gui.username_var.get(),
+                "config_path": self.gui.config_path_var.get(),
+                "result_path": self.gui.result_path_var.get()
+            })
+            if not saved:
+                raise Exception("database write failed")
             
             self.gui.log_message("Configuration saved successfully")
             messagebox.showinfo("Success", "Configuration saved successfully")
@@ -193,111 +344,151 @@ class GUIUtils:
     def load_history(self):
         """Load history from database with timezone conversion"""
         try:
-            if not hasattr(self.gui, 'history_table'):
+            if self.history_table is None:
                 return
-                
-            # Clear existing history
-            for item in self.gui.history_table.get_children():
-                self.gui.history_table.delete(item)
             
-            # Kiểm tra database có bảng nào
-            import sqlite3
-            conn = sqlite3.connect("data/history.db")
-            cursor = conn.cursor()
-            
-            # Kiểm tra các bảng trong database
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = [t[0] for t in cursor.fetchall()]
-            self.gui.log_debug(f"Database tables: {', '.join(tables)}")
+            self._last_filter_key = None
             
-            # Chọn bảng phù hợp
-            if "test_results" in tables:
-                table_name = "test_results"
-            elif "test_file_results" in tables:
-                table_name = "test_file_results"
-            else:
+            if self._table_name is None:
+                children = self.history_table.get_children()
+                if children:
+                    self.history_table.delete(*children)
                 self.gui.log_message("No history tables found in database")
-                conn.close()
                 return
+            
+            self._start_history_job(self._history_query, (), AppConfig.HISTORY_LOAD_LIMIT, True, None)
                 
-            # Debug: kiểm tra cột của bảng
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = [c[1] for c in cursor.fetchall()]
-            self.gui.log_debug(f"Table {table_name} columns: {', '.join(columns)}")
-            
-            # Load recent history
-            cursor.execute(f"SELECT * FROM {table_name} ORDER BY timestamp DESC LIMIT 100")
-            history_data = cursor.fetchall()
-            
-            # Get column names
-            column_names = [d[0] for d in cursor.description]
-            
-            # Find indexes of columns we need
-            timestamp_idx = column_names.index("timestamp") if "timestamp" in column_names else 0
-            file_name_idx = column_names.index("file_name") if "file_name" in column_names else 1
-            test_count_idx = column_names.index("test_count") if "test_count" in column_names else 2
-            result_idx = column_names.index("overall_result") if "overall_result" in column_names else 3
-            time_idx = column_names.index("execution_time") if "execution_time" in column_names else 4
-            wan_idx = column_names.index("affects_wan") if "affects_wan" in column_names else 5
-            lan_idx = column_names.index("affects_lan") if "affects_lan" in column_names else 6
-            
-            for record in history_data:
-                # Chuyển đổi timestamp từ UTC sang múi giờ địa phương
-                timestamp = record[timestamp_idx] if timestamp_idx < len(record) else ""
-                local_timestamp = self.convert_to_local_time(timestamp)
-                
-                if " " in local_timestamp:
-                    date, time_str = local_timestamp.split(" ", 1)
-                else:
-                    date = local_timestamp
-                    time_str = ""
-                
-                # Lấy kết quả tổng thể, đảm bảo không là None
-                overall_result = record[result_idx] if result_idx < len(record) and record[result_idx] else "Unknown"
-                
-                # Tạo thông tin chi tiết
-                exec_time = record[time_idx] if time_idx < len(record) else 0
-                affects_wan = record[wan_idx] if wan_idx < len(record) else False
-                affects_lan = record[lan_idx] if lan_idx < len(record) else False
-                
-                details = f"Execution time: {exec_time:.1f}s"
-                if affects_wan or affects_lan:
-                    details += " (Network affecting)"
-                
-                self.gui.history_table.insert("", "end", values=(
-                    date,
-                    time_str,
-                    record[file_name_idx] if file_name_idx < len(record) else "",
-                    record[test_count_idx] if test_count_idx < len(record) else 0,
-                    overall_result,
-                    details
-                ))
+        except Exception as e:
+            self.gui.log_error("Error loading history: %s", e)
+    
+    def _start_history_job(self, query, params, limit, local_time, filter_key):
+        """Run a history query on a worker thread and poll for its rows"""
+        self._history_job += 1
+        threading.Thread(
+            target=self._load_history_worker,
+            args=(self._history_job, query, params, limit, local_time, filter_key),
+            daemon=True
+        ).start()
+        
+        if not self._history_polling:
+            self._history_polling = True
+            self.gui.root.after(50, self._drain_history_queue)
+    
+    def _load_history_worker(self, job, query, params, limit, local_time, filter_key):
+        """Fetch and format history rows off the Tk thread"""
+        try:
+            # Rows stay plain tuples (no row_factory); fetch the whole LIMIT in one batch
+            with self._db_lock:
+                cursor = self._conn.cursor()
+                cursor.arraysize = limit
+                cursor.execute(query, params)
+                history_data = cursor.fetchmany()
+            
+            rows = [self._format_history_row(record, local_time) for record in history_data]
+            self._history_queue.put((job, rows, filter_key, None))
+            
+        except Exception as e:
+            self._history_queue.put((job, None, filter_key, e))
+    
+    def _format_history_row(self, record, local_time):
+        """Build history table values from a HISTORY_COLUMNS record"""
+        timestamp = record[0] or ""
+        if local_time:
+            # Chuyển đổi timestamp từ UTC sang múi giờ địa phương
+            timestamp = self.convert_to_local_time(timestamp)
+        
+        if len(timestamp) >= 19:
+            # Fixed-width "YYYY-MM-DD HH:MM:SS"
+            date = timestamp[:10]
+            time_str = timestamp[11:19]
+        elif " " in timestamp:
+            date, time_str = timestamp.split(" ", 1)
+        else:
+            date = timestamp
+            time_str = ""
+        
+        # Lấy kết quả tổng thể, đảm bảo không là None
+        overall_result = record[3] or "Unknown"
+        
+        # affects_wan or affects_lan
+        details = f"Execution time: {record[4] or 0:.1f}s{' (Network affecting)' if record[5] or record[6] else ''}"
+        
+        return (
+            date,
+            time_str,
+            record[1],  # file_name
+            record[2],  # test_count
+            overall_result,
+            details
+        )
+    
+    def _drain_history_queue(self):
+        """Insert rows prepared by the history worker once they arrive"""
+        try:
+            job, rows, filter_key, error = self._history_queue.get_nowait()
+        except queue.Empty:
+            self.gui.root.after(50, self._drain_history_queue)
+            return
+        
+        if job != self._history_job:
+            # Superseded by a newer refresh, keep polling for that one
+            self.gui.root.after(0, self._drain_history_queue)
+            return
+        
+        self._history_polling = False
+        
+        if error is not None:
+            if filter_key is None:
+                self.gui.log_error("Error loading history: %s", error)
+            else:
+                self.gui.log_error("Error applying history filter: %s", error)
+            return
+        
+        try:
+            children = self.history_table.get_children()
+            if children:
+                self.history_table.delete(*children)
+            
+            for values in rows:
+                self.history_table.insert("", "end", values=values)
             
-            conn.close()
+            if filter_key is not None:
+                self._last_filter_key = filter_key
+                self.gui.log_result(f"Filtered history: showing {len(rows)} records")
                 
         except Exception as e:
-            self.gui.log_error(f"Error loading history: {str(e)}")
+            self.gui.log_error("Error displaying history: %s", e)
 
+    def mark_history_dirty(self):
+        """Mark history as changed so the next filter refresh re-queries"""
+        self._history_dirty = True
+    
     def convert_to_local_time(self, utc_timestamp):
         """Convert UTC timestamp to local timezone (UTC+7)"""
         try:
-            import datetime
-            
             if not utc_timestamp:
                 return ""
+            
+            # Fast path cho định dạng cố định "YYYY-MM-DD HH:MM:SS"
+            if len(utc_timestamp) == 19 and utc_timestamp[10] == " ":
+                local_dt = datetime.datetime(
+                    int(utc_timestamp[0:4]), int(utc_timestamp[5:7]), int(utc_timestamp[8:10]),
+                    int(utc_timestamp[11:13]), int(utc_timestamp[14:16]), int(utc_timestamp[17:19])
+                ) + self.LOCAL_OFFSET
+                return local_dt.strftime("%Y-%m-%d %H:%M:%S")
                 
             # Phân tích chuỗi thời gian UTC
             if " " in utc_timestamp:
-                utc_dt = datetime.datetime.strptime(utc_timestamp, "%Y-%m-%d %H:%M:%S")
+                utc_dt = _strptime(utc_timestamp, "%Y-%m-%d %H:%M:%S")
             else:
                 # Nếu chỉ có ngày không có giờ
-                utc_dt = datetime.datetime.strptime(utc_timestamp, "%Y-%m-%d")
+                utc_dt = _strptime(utc_timestamp, "%Y-%m-%d")
                 
             # Thêm thông tin múi giờ (UTC)
             utc_dt = utc_dt.replace(tzinfo=datetime.timezone.utc)
             
             # Chuyển đổi sang múi giờ địa phương
-            local_tz = datetime.timezone(datetime.timedelta(hours=7))  # UTC+7
+            local_tz = datetime.timezone(self.LOCAL_OFFSET)  # UTC+7
             local_dt = utc_dt.astimezone(local_tz)
             
             # Format theo định dạng ban đầu
@@ -307,7 +498,7 @@ class GUIUtils:
                 return local_dt.strftime("%Y-%m-%d")
                 
         except Exception as e:
-            self.gui.log_error(f"Error converting timestamp: {str(e)}")
+            self.gui.log_error("Error converting timestamp: %s", e)
             return utc_timestamp  # Trả về giá trị ban đầu nếu có lỗi
     
     def clear_history(self):
@@ -316,9 +507,11 @@ class GUIUtils:
         if confirm:
             try:
                 self.database.clear_history()
-                if hasattr(self.gui, 'history_table'):
-                    for item in self.gui.history_table.get_children():
-                        self.gui.history_table.delete(item)
+                self.mark_history_dirty()
+                if self.history_table is not None:
+                    children = self.history_table.get_children()
+                    if children:
+                        self.history_table.delete(*children)
                 self.gui.log_message("History cleared")
                 messagebox.showinfo("Success", "History cleared successfully")
             except Exception as e:
@@ -331,7 +524,7 @@ class GUIUtils:
     
     def export_results(self):
         """Export current results to CSV"""
-        if not hasattr(self.gui, 'file_table'):
+        if self.file_table is None:
             return
             
         file_path = filedialog.asksaveasfilename(
@@ -349,8 +542,8 @@ class GUIUtils:
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 
                 writer.writeheader()
-                for item in self.gui.file_table.get_children():
-                    values = self.gui.file_table.item(item, "values")
+                for item in self.file_table.get_children():
+                    values = self.file_table.item(item, "values")
                     if len(values) >= 6:
                         writer.writerow({
                             'File': values[0],
@@ -365,13 +558,13 @@ class GUIUtils:
             messagebox.showinfo("Export Complete", f"Results exported to {file_path}")
             
         except Exception as e:
-            self.gui.log_error(f"Error exporting results: {str(e)}")
+            self.gui.log_error("Error exporting results: %s", e)
             messagebox.showerror("Export Error", f"Failed to export results: {str(e)}")
     
     def export_history(self):
         """Export history to CSV file"""
         try:
-            if not hasattr(self.gui, 'history_table'):
+            if self.history_table is None:
                 return
                 
             file_path = filedialog.asksaveasfilename(
@@ -384,7 +577,7 @@ class GUIUtils:
                 return
                 
             # Get all items from history table
-            all_items = self.gui.history_table.get_children()
+            all_items = self.history_table.get_children()
             if not all_items:
                 messagebox.showinfo("No Data", "No history data to export")
                 return
@@ -395,7 +588,7 @@ class GUIUtils:
                 
                 writer.writeheader()
                 for item in all_items:
-                    values = self.gui.history_table.item(item, "values")
+                    values = self.history_table.item(item, "values")
                     if len(values) >= 6:
                         writer.writerow({
                             'Date': values[0],
@@ -410,7 +603,7 @@ class GUIUtils:
             messagebox.showinfo("Export Complete", f"History data exported to {file_path}")
             
         except Exception as e:
-            self.gui.log_error(f"Error exporting history: {str(e)}")
+            self.gui.log_error("Error exporting history: %s", e)
             messagebox.showerror("Export Error", f"Failed to export history: {str(e)}")
     
     def export_logs(self):
@@ -437,118 +630,81 @@ class GUIUtils:
             messagebox.showinfo("Export Complete", f"Logs exported to {file_path}")
             
         except Exception as e:
-            self.gui.log_error(f"Error exporting logs: {str(e)}")
+            self.gui.log_error("Error exporting logs: %s", e)
             messagebox.showerror("Export Error", f"Failed to export logs: {str(e)}")
     
     def apply_history_filter(self):
         """Apply filters to history view"""
         try:
-            if not hasattr(self.gui, 'history_table') or not hasattr(self.gui, 'date_combo') or not hasattr(self.gui, 'status_combo'):
+            if self.history_table is None or not hasattr(self.gui, 'date_combo') or not hasattr(self.gui, 'status_combo'):
                 return
             
-            # Clear existing history
-            for item in self.gui.history_table.get_children():
-                self.gui.history_table.delete(item)
-            
             # Get filter values
             date_filter = self.gui.date_combo.get()
             status_filter = self.gui.status_combo.get()
             
-            # Debug current filters
-            self.gui.log_debug(f"Applying filter - Date: {date_filter}, Status: {status_filter}")
-            
-            # Connect to database
-            import sqlite3
-            conn = sqlite3.connect("data/history.db")
-            cursor = conn.cursor()
-            
-            # Check which tables exist
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = [t[0] for t in cursor.fetchall()]
+            today = datetime.datetime.now().strftime("%Y-%m-%d")
             
-            # Select appropriate table
-            if "test_results" in tables:
-                table_name = "test_results"
-            elif "test_file_results" in tables:
-                table_name = "test_file_results"
-            else:
-                self.gui.log_message("No history tables found in database")
-                conn.close()
+            # Skip the refresh when the same filter is already displayed
+            filter_key = (date_filter, status_filter, today)
+            if filter_key == self._last_filter_key and not self._history_dirty:
+                self.gui.log_debug("History filter unchanged, skipping refresh")
                 return
-                
-            # Get date range based on filter
-            date_condition = ""
-            params = []
             
-            import datetime
-            today = datetime.datetime.now().strftime("%Y-%m-%d")
+            self._last_filter_key = None
             
-            if date_filter == "Today":
-                date_condition = f"WHERE {table_name}.timestamp LIKE ?"
-                params.append(f"{today}%")
-            elif date_filter == "Last 7 Days":
-                date_condition = f"WHERE {table_name}.timestamp >= date('now', '-7 days')"
-            elif date_filter == "Last 30 Days":
-                date_condition = f"WHERE {table_name}.timestamp >= date('now', '-30 days')"
+            # Debug current filters
+            self.gui.log_debug("Applying filter - Date: %s, Status: %s", date_filter, status_filter)
             
-            # Add status filter if needed
-            if status_filter != "All":
-                if date_condition:
-                    date_condition += " AND "
-                else:
-                    date_condition = "WHERE "
-                
-                date_condition += f"{table_name}.overall_result LIKE ?"
-                params.append(f"%{status_filter}%")
+            if self._table_name is None:
+                children = self.history_table.get_children()
+                if children:
+                    self.history_table.delete(*children)
+                self.gui.log_message("No history tables found in database")
+                return
             
             # Get filtered history
-            query = f"""
-            SELECT timestamp, file_name, test_count, overall_result, execution_time, 
-                   affects_wan, affects_lan
-            FROM {table_name}
-            {date_condition}
-            ORDER BY timestamp DESC
-            """
-            
-            self.gui.log_debug(f"Executing filter query: {query} with params: {params}")
-            cursor.execute(query, params)
-            history_data = cursor.fetchall()
-            
-            # Debug count
-            self.gui.log_debug(f"Filter query returned {len(history_data)} records")
-            
-            # Display filtered data
-            for record in history_data:
-                timestamp = record[0]
-                if " " in timestamp:
-                    date, time_str = timestamp.split(" ", 1)
-                else:
-                    date = timestamp
-                    time_str = ""
-                
-                # Ensure overall_result is not None
-                overall_result = record[3] if record[3] is not None else "Unknown"
-                
-                details = f"Execution time: {record[4]:.1f}s"
-                if record[5] or record[6]:  # affects_wan or affects_lan
-                    details += " (Network affecting)"
-                
-                self.gui.history_table.insert("", "end", values=(
-                    date,
-                    time_str,
-                    record[1],  # file_name
-                    record[2],  # test_count
-                    overall_result,  # overall_result
-                    details
-                ))
+            has_status = status_filter != "All"
+            query = self._filter_queries.get((date_filter, has_status), self._filter_queries[("All", has_status)])
+            params = self._build_params(date_filter, status_filter, today)
             
-            conn.close()
+            self.gui.log_debug("Executing filter query: %s with params: %s", query, params)
             
-            filtered_count = len(self.gui.history_table.get_children())
-            self.gui.log_result(f"Filtered history: showing {filtered_count} records")
+            # Writes after this point mark the history dirty again
+            self._history_dirty = False
+            self._start_history_job(query, params, AppConfig.HISTORY_FILTER_LIMIT, False, filter_key)
             
         except Exception as e:
-            self.gui.log_error(f"Error applying history filter: {str(e)}")
+            self.gui.log_error("Error applying history filter: %s", e)
+    
+    def _build_filter_queries(self):
+        """Precompute the filter query for each date filter and status-filter state"""
+        queries = {}
+        for date_filter, date_condition in _DATE_CONDITIONS.items():
+            for has_status in (False, True):
+                conditions = [date_condition] if date_condition else []
+                if has_status:
+                    conditions.append("overall_result LIKE ?")
+                where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+                queries[(date_filter, has_status)] = f"{self._filter_select} {where}ORDER BY timestamp DESC LIMIT ?"
+        return queries
+    
+    def _build_params(self, date_filter, status_filter, today):
+        """Build bound parameters matching the query from _build_filter_queries"""
+        params = []
+        
+        if date_filter == "Today":
+            params.append(f"{today}%")
+        elif date_filter in _DATE_RANGE_DAYS:
+            # Timestamps are stored in UTC, same as SQLite's date('now')
+            utc_today = datetime.datetime.now(datetime.timezone.utc).date()
+            params.append((utc_today - datetime.timedelta(days=_DATE_RANGE_DAYS[date_filter])).isoformat())
+        
+        if status_filter != "All":
+            params.append(f"%{status_filter}%")
+        
+        params.append(AppConfig.HISTORY_FILTER_LIMIT)
+        return params
     
     def clear_history_filter(self):
         """Clear history filters"""
@@ -562,19 +718,16 @@ class GUIUtils:
     def view_history_details(self):
         """View detailed information for selected history item"""
         try:
-            import tkinter as tk
-            from tkinter import ttk
-
-            if not hasattr(self.gui, 'history_table'):
+            if self.history_table is None:
                 return
                 
-            selection = self.gui.history_table.selection()
+            selection = self.history_table.selection()
             if not selection:
                 messagebox.showinfo("No Selection", "Please select a history item to view details")
                 return
                 
             item = selection[0]
-            values = self.gui.history_table.item(item, "values")
+            values = self.history_table.item(item, "values")
             
             if len(values) < 3:
                 messagebox.showinfo("Error", "Invalid history item selected")
@@ -651,6 +804,9 @@ class GUIUtils:
             details_table.column("details", width=350)
             details_table.column("time", width=100)
             
+            details_table.tag_configure("pass", background="#e8f5e9")
+            details_table.tag_configure("fail", background="#ffebee")
+            
             # Add vertical scrollbar
             scrollbar = ttk.Scrollbar(details_frame, orient=tk.VERTICAL, command=details_table.yview)
             details_table.configure(yscrollcommand=scrollbar.set)
@@ -667,21 +823,17 @@ class GUIUtils:
                 exec_time = detail.get("execution_time", 0)
                 time_text = f"{exec_time:.2f}s" if exec_time else ""
                 
-                item_id = details_table.insert("", "end", values=(
+                # Set row colors based on status
+                status_lower = status.lower()
+                tag = "pass" if status_lower == "pass" else ("fail" if status_lower == "fail" else "")
+                
+                details_table.insert("", "end", values=(
                     detail.get("service", ""),
                     detail.get("action", ""),
                     status_text,
                     detail.get("details", ""),
                     time_text
-                ))
-                
-                # Set row colors based on status
-                if status.lower() == "pass":
-                    details_table.tag_configure("pass", background="#e8f5e9")
-                    details_table.item(item_id, tags=("pass",))
-                elif status.lower() == "fail":
-                    details_table.tag_configure("fail", background="#ffebee")
-                    details_table.item(item_id, tags=("fail",))
+                ), tags=(tag,) if tag else ())
             
             # Bottom buttons
             btn_frame = ttk.Frame(details_window)
@@ -705,7 +857,7 @@ class GUIUtils:
             self.gui.root.wait_window(details_window)
             
         except Exception as e:
-            self.gui.log_error(f"Error viewing history details: {str(e)}")
+            self.gui.log_error("Error viewing history details: %s", e)
             messagebox.showerror("Error", f"Failed to display details: {str(e)}")
     
     def export_test_details(self, file_name, test_details):
@@ -720,25 +872,17 @@ class GUIUtils:
             if not file_path:
                 return
                 
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['Service', 'Action', 'Status', 'Details', 'Execution Time (s)']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            with open(file_path, 'w', newline='', encoding='utf-8', buffering=_EXPORT_BUFFER_SIZE) as csvfile:
+                writer = csv.writer(csvfile)
                 
-                writer.writeheader()
-                for detail in test_details:
-                    writer.writerow({
-                        'Service': detail.get("service", ""),
-                        'Action': detail.get("action", ""),
-                        'Status': detail.get("status", "").capitalize(),
-                        'Details': detail.get("details", ""),
-                        'Execution Time (s)': f"{detail.get('execution_time', 0):.2f}"
-                    })
+                writer.writerow(_EXPORT_HEADER)
+                writer.writerows(map(_export_row, test_details))
                     
             self.gui.log_result(f"Test details exported to {file_path}")
             messagebox.showinfo("Export Complete", f"Test details exported to {file_path}")
             
         except Exception as e:
-            self.gui.log_error(f"Error exporting test details: {str(e)}")
+            self.gui.log_error("Error exporting test details: %s", e)
             messagebox.showerror("Export Error", f"Failed to export details: {str(e)}")
     
     def filter_logs(self):
@@ -747,36 +891,46 @@ class GUIUtils:
             return
             
         selected_level = self.gui.log_level_var.get()
+        log_text = self.gui.log_text
+        
+        # Filtering only hides lines with the elided "hidden" tag, so resetting
+        # never rewrites the buffer
+        log_text.tag_remove("hidden", "1.0", tk.END)
         
         if selected_level == "All":
-            # Reload all logs
+            # Show all logs again
             self.refresh_logs()
             return
         
-        # Map level name to emoji/prefix
-        level_prefix = {
-            "Connection": "🔌 CONNECTION:",
-            "File": "📄 FILE:",
-            "Result": "✅ RESULT:",
-            "Error": "❌ ERROR:",
-            "Debug": "🔍 DEBUG:",
-        }
-        
-        # Get current log content
-        log_content = self.gui.log_text.get("1.0", tk.END)
-        
-        # Clear current content
-        self.gui.log_text.delete("1.0", tk.END)
-        
-        # Filter and re-insert relevant lines
-        for line in log_content.splitlines():
-            if level_prefix.get(selected_level, "") in line:
-                self.gui.log_text.insert(tk.END, line + "\n")
+        prefix = _LEVEL_PREFIX.get(selected_level)
+        if prefix is None:
+            # Unknown level: nothing to filter on, show the full log instead
+            self.gui.log_debug("Unknown log level '%s', showing all logs", selected_level)
+            self.refresh_logs()
+            return
         
-        # Scroll to end
-        self.gui.log_text.see(tk.END)
+        try:
+            # Hide everything between consecutive matching lines; the tail stops
+            # at end-1c so lines appended later are not inherited into the tag
+            start = "1.0"
+            while True:
+                pos = log_text.search(prefix, start, stopindex="end-1c", nocase=True)
+                if not pos:
+                    if log_text.compare(start, "<", "end-1c"):
+                        log_text.tag_add("hidden", start, "end-1c")
+                    break
+                line_start = log_text.index(f"{pos} linestart")
+                if log_text.compare(start, "<", line_start):
+                    log_text.tag_add("hidden", start, line_start)
+                start = log_text.index(f"{pos} +1 lines linestart")
+            
+            # Scroll to end
+            log_text.see(tk.END)
+        except Exception as e:
+            self.gui.log_error("Error filtering logs: %s", e)
+            return
         
-        self.gui.log_debug(f"Log filtered to show only {selected_level} entries")
+        self.gui.log_debug("Log filtered to show only %s entries", selected_level)
     
     def clear_logs(self):
         """Clear the log display"""
@@ -795,38 +949,38 @@ class GUIUtils:
     def debug_database(self):
         """Debug database structure and content"""
         try:
-            import sqlite3
-            conn = sqlite3.connect("data/history.db")
-            cursor = conn.cursor()
-            
-            # Get list of tables
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            tables = cursor.fetchall()
-            
-            self.gui.log_debug("Database tables: " + ', '.join([t[0] for t in tables]))
-            
-            # Get columns for each table
-            for table in tables:
-                table_name = table[0]
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns = cursor.fetchall()
-                column_names = [col[1] for col in columns]
-                self.gui.log_debug(f"Table {table_name} columns: {', '.join(column_names)}")
-                
-            # Get recent records from relevant tables
-            for table_name in ["test_results", "test_file_results"]:
-                if table_name in [t[0] for t in tables]:
+            # Reuse the shared history connection instead of reconnecting per click
+            with self._db_lock:
+                cursor = self._conn.cursor()
+                
+                # Get list of tables
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                tables = cursor.fetchall()
+                table_set = frozenset(t[0] for t in tables)
+                
+                self.gui.log_debug("Database tables: %s", ', '.join(sorted(table_set)))
+                
+                # Get columns for each table
+                for table in tables:
+                    table_name = table[0]
+                    cursor.execute(f"PRAGMA table_info({table_name})")
+                    columns = cursor.fetchall()
+                    column_names = [col[1] for col in columns]
+                    self.gui.log_debug("Table %s columns: %s", table_name, ', '.join(column_names))
+                    
+                # Get recent records from relevant tables
+                for table_name in sorted({"test_results", "test_file_results"} & table_set):
                     cursor.execute(f"SELECT file_name, overall_result FROM {table_name} ORDER BY id DESC LIMIT 5")
                     records = cursor.fetchall()
-                    self.gui.log_debug(f"Recent {table_name} records:")
+                    self.gui.log_debug("Recent %s records:", table_name)
                     for rec in records:
-                        self.gui.log_debug(f"  {rec[0]}: {rec[1]}")
-                
-            conn.close()
+                        self.gui.log_debug("  %s: %s", rec[0], rec[1])
+                    
+                cursor.execute("PRAGMA optimize")
             
             self.gui.log_message("Database analysis complete")
         except Exception as e:
-            self.gui.log_error(f"Error checking database structure: {str(e)}")
+            self.gui.log_error("Error checking database structure: %s", e)
     
     def show_documentation(self):
         """Show documentation"""
@@ -853,6 +1007,6 @@ class GUIUtils:
             "Test Case Manager v2.0\n"
             "Windows Edition\n\n"
             "© 2025 juno-kyojin\n\n"
-            f"User: {os.environ.get('USERNAME', 'unknown')}"
+            f"User: {_USERNAME}"
         )
         messagebox.showinfo("About", about_msg)
\ No newline at end of file
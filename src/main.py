@@ -7,8 +7,9 @@
 
 import os
 import sys
+import atexit
 import logging
-import tkinter as tk
+import platform
 import sqlite3
 
 # Thêm thư mục hiện tại vào Python path
@@ -18,10 +19,14 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
 # Thay đổi cách import
-from gui.interface import ApplicationGUI
-from network.connection import SSHConnection
-from files.manager import TestFileManager
-from storage.database import TestDatabase
+from storage.database import apply_perf_pragmas
+
+# Log file của ứng dụng và các thư mục lá cần tạo khi khởi động
+LOG_FILE = "data/app_log.txt"
+_DIRECTORY_LEAVES = ("data/temp/results", "logs")
+
+# Nền tảng không đổi trong suốt vòng đời process
+_PLATFORM = platform.system()
 
 def ensure_database():
     """Ensure database structure is set up correctly"""
@@ -29,6 +34,7 @@ def ensure_database():
     os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
     conn = sqlite3.connect(db_path)
+    apply_perf_pragmas(conn)
     cursor = conn.cursor()
     
     # Check if tables exist
@@ -72,18 +78,46 @@ def ensure_database():
         )
         ''')
     
+    # Secondary indexes for lookups by file name, recency and parent row.
+    # Low-cardinality columns (affects_wan, affects_lan, send_status) are left unindexed.
+    indexes = {
+        "idx_tfr_file_name": "CREATE INDEX IF NOT EXISTS idx_tfr_file_name ON test_file_results(file_name)",
+        "idx_tfr_timestamp": "CREATE INDEX IF NOT EXISTS idx_tfr_timestamp ON test_file_results(timestamp DESC)",
+        "idx_tcr_file_result_id": "CREATE INDEX IF NOT EXISTS idx_tcr_file_result_id ON test_case_results(file_result_id)"
+    }
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
+    existing_indexes = {row[0] for row in cursor.fetchall()}
+    missing_indexes = [name for name in indexes if name not in existing_indexes]
+    
+    if missing_indexes:
+        logging.info(f"Creating indexes: {', '.join(missing_indexes)}")
+        for name in missing_indexes:
+            cursor.execute(indexes[name])
+        # Gather statistics once so the planner picks up the new indexes
+        cursor.execute("ANALYZE")
+    
     conn.commit()
+    cursor.execute("PRAGMA optimize")
     conn.close()
     logging.info("Database structure verified")
 
-def setup_directories():
+def optimize_database():
+    """Refresh query planner statistics before the application exits"""
+    try:
+        conn = sqlite3.connect("data/history.db")
+        conn.execute("PRAGMA optimize")
+        conn.close()
+    except Exception as e:
+        logging.warning(f"Database optimize failed: {e}")
+
+def setup_directories(log_file=LOG_FILE):
     """Setup required directories"""
-    directories = [
-        "data",
-        "data/temp",
-        "data/temp/results",
-        "logs"
-    ]
+    # Chỉ tạo các thư mục lá - makedirs tự tạo thư mục cha
+    directories = set(_DIRECTORY_LEAVES)
+    log_dir = os.path.dirname(log_file)
+    if log_dir and not any(d.startswith(log_dir + "/") for d in directories):
+        directories.add(log_dir)
     
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
@@ -107,20 +141,17 @@ def setup_logging():
 
 def check_windows():
     """Verify running on Windows"""
-    import platform
-    if platform.system().lower() != "windows":
+    if _PLATFORM.lower() != "windows":
         print("Error: This application is designed to run on Windows only.")
-        print("Current platform:", platform.system())
+        print("Current platform:", _PLATFORM)
         sys.exit(1)
 
-def configure_logging(log_file="data/app_log.txt"):
+def configure_logging(log_file=LOG_FILE):
     """Configure logging with proper encoding for Vietnamese characters"""
     import logging
     import sys
     
-    # Đảm bảo thư mục tồn tại
-    import os
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    # Thư mục của log_file đã được tạo trong setup_directories()
     
     # Cấu hình logging
     log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -139,36 +170,20 @@ def configure_logging(log_file="data/app_log.txt"):
     except:
         pass
     
+    # Cấu hình lại console một lần để ghi UTF-8, ký tự không hỗ trợ được thay thế
+    for stream in (sys.stdout, sys.stderr):
+        if hasattr(stream, "reconfigure"):
+            stream.reconfigure(encoding='utf-8', errors='replace')
+    
     # Tạo stream handler với encoding phù hợp
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(log_formatter)
-    stream_handler.setLevel(logging.INFO)
-    
-    # Lớp bọc an toàn cho StreamHandler để tránh lỗi Unicode
-    class SafeStreamHandler(logging.StreamHandler):
-        def emit(self, record):
-            try:
-                super().emit(record)
-            except UnicodeEncodeError:
-                msg = record.getMessage()
-                try:
-                    # Cố gắng encode bằng ASCII với thay thế
-                    safe_msg = msg.encode('ascii', 'replace').decode('ascii')
-                    record.msg = safe_msg
-                    record.args = ()
-                    super().emit(record)
-                except:
-                    pass  # Bỏ qua nếu vẫn không thể ghi log
-    
-    # Sử dụng SafeStreamHandler thay cho StreamHandler
-    safe_console = SafeStreamHandler()
-    safe_console.setFormatter(log_formatter)
     
     # Cấu hình root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
     root_logger.addHandler(file_handler)
-    root_logger.addHandler(safe_console)
+    root_logger.addHandler(stream_handler)
     
     return root_logger
 
@@ -179,21 +194,25 @@ def main():
         check_windows()
         
         # Setup required directories
-        setup_directories()
+        setup_directories(LOG_FILE)
         
         # Initialize logging with Unicode support
-        configure_logging()  # Thay thế setup_logging() bằng configure_logging()
+        configure_logging(LOG_FILE)  # Thay thế setup_logging() bằng configure_logging()
         
         # Đảm bảo database được khởi tạo đúng cách
         ensure_database()
+        atexit.register(optimize_database)
+        
+        # Start GUI - tkinter and the GUI modules are only imported once the checks pass
+        import tkinter as tk
+        from gui.interface import ApplicationGUI
         
-        # Start GUI
         root = tk.Tk()
         app = ApplicationGUI(root)
         root.mainloop()
         
     except Exception as e:
-        logging.error(f"Failed to start application: {e}")
+        logging.error("Failed to start application: %s", e)
         print(f"Error starting application: {e}")
         sys.exit(1)
         
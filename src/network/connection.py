@@ -4,25 +4,127 @@
 
 import paramiko
 import logging
+import re
 import time
 import os
+import queue
+import select
+import shutil
+import socket
 import subprocess
+import threading
 import tempfile
 import base64
-from typing import Optional, Tuple
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# libssh2 backend for large transfers is optional (pip install ssh2-python)
+try:
+    from .connection_libssh2 import Libssh2Sftp
+except ImportError:
+    Libssh2Sftp = None
+
+# Kích thước mỗi lần đọc/ghi khi truyền file qua SFTP
+_TRANSFER_CHUNK_SIZE = 1 << 20
+
+# Marker echoed with the exit status after each command of execute_batch
+_BATCH_SEPARATOR = "__BATCH_RC__"
+_BATCH_STATUS = re.compile(_BATCH_SEPARATOR + r"(\d+)\n?")
+
+# Persistent shell: each command is followed by its exit status and an end-of-command sentinel
+_SHELL_SENTINEL = "__CMD_DONE_3f9c1e__"
+_SHELL_STATUS = re.compile(rb"__RC_(\d+)__" + _SHELL_SENTINEL.encode())
+_SHELL_STDERR_END = _SHELL_SENTINEL.encode() + b"\n"
+# Commands with a longer timeout than this keep their own exec channel
+_SHELL_MAX_TIMEOUT = 30
+
+# Per-channel receive window: lets many SFTP WRITE packets be in flight on high-latency links
+_CHANNEL_WINDOW_SIZE = 8 << 20
+# Seconds between transport keepalives, so idle NAT/firewall state is not dropped
+_KEEPALIVE_INTERVAL = 30
+
+# ping() sends a real keepalive at most this often (seconds)
+_PING_INTERVAL = 30
+
+# execute_command retry backoff: 0.1s doubling per attempt, capped at 1s
+_RETRY_BASE_DELAY = 0.1
+_RETRY_MAX_DELAY = 1.0
+# Failures worth a reconnect; socket.timeout from ChannelFile.read has an empty message
+_RETRYABLE_ERRORS = (socket.timeout, paramiko.SSHException, EOFError)
+
+class _CommandNotStarted(Exception):
+    """A command failed before reaching the device (no channel/shell), so running it again is safe"""
+
+# Base64 streaming: raw chunks are a multiple of 3 bytes so each encodes without padding
+_BASE64_CHUNK_SIZE = 3 * 65536
+# Files below this size are sent as one command through the persistent shell
+_BASE64_INLINE_LIMIT = 32 * 1024
+
+# AEAD ciphers (AES-NI on Windows clients, chacha20 on ARM routers) tried before AES-CTR + HMAC
+_FAST_CIPHERS = ("aes128-gcm@openssh.com", "aes256-gcm@openssh.com", "chacha20-poly1305@openssh.com")
+_FAST_MACS = ("hmac-sha2-256-etm@openssh.com",)
+
+def _prefer_first(preferred, current, supported):
+    """Move the supported algorithms from preferred to the front of current"""
+    first = tuple(name for name in preferred if name in supported)
+    return first + tuple(name for name in current if name not in first)
+
+# Only names this paramiko build implements are promoted, so negotiation never offers an unknown one
+paramiko.Transport._preferred_ciphers = _prefer_first(
+    _FAST_CIPHERS, paramiko.Transport._preferred_ciphers, paramiko.Transport._cipher_info
+)
+paramiko.Transport._preferred_macs = _prefer_first(
+    _FAST_MACS, paramiko.Transport._preferred_macs, paramiko.Transport._mac_info
+)
+
+@functools.lru_cache(maxsize=4096)
+def _norm(remote_path: str) -> str:
+    """Remote path with forward slashes; cached since the same paths recur for every transfer"""
+    return remote_path.replace('\\', '/')
+
+@functools.lru_cache(maxsize=4096)
+def _norm_local(local_path: str) -> str:
+    """Local Windows path with backslashes"""
+    return local_path.replace('/', '\\')
 
 class SSHConnection:
     def __init__(self):
         self.client: Optional[paramiko.SSHClient] = None
+        self._sftp: Optional[paramiko.SFTPClient] = None
+        # Set when the device has no SFTP subsystem (e.g. BusyBox/Dropbear), so later
+        # calls skip the failing subsystem request and use the exec fallbacks directly
+        self._sftp_unavailable = False
+        self._shell: Optional[paramiko.Channel] = None
+        self._shell_lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
         self.connected = False
         self.hostname = None
         self.username = None
         self.password = None
+        self.port = 22
+        self._last_ping = 0.0
+        # Remote directories already created during this session
+        self._ensured_dirs = set()
+        # Whether the device has openssl for base64 decoding; None until probed
+        self._has_openssl: Optional[bool] = None
+        # Native SFTP session used for transfers when ssh2-python is installed;
+        # opened on the first transfer, not at connect
+        self._libssh2 = None
+        self._libssh2_tried = False
+        self._libssh2_lock = threading.Lock()
+        self._backend = "paramiko"
+        self._connect_timeout = 10
+        # Remote path prefix -> local path where the device exports it (NFS/CIFS share)
+        self.shared_mount_map: Dict[str, str] = {}
     
-    def connect(self, hostname: str, username: str, password: str, port: int = 22, timeout: int = 10) -> bool:
+    def connect(self, hostname: str, username: str, password: str, port: int = 22, timeout: int = 10,
+                compress: bool = True) -> bool:
         """
-        Establish SSH connection and store credentials for file transfers
+        Establish SSH connection and store credentials for file transfers.
+        
+        compress requests zlib compression for the whole session; it is negotiated
+        at key exchange, so it cannot be toggled per file afterwards.
         """
         try:
             self.disconnect()
@@ -32,6 +134,7 @@ class SSHConnection:
             self.username = username
             self.password = password
             self.port = port
+            self._connect_timeout = timeout
             
             self.client = paramiko.SSHClient()
             self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -44,15 +147,24 @@ class SSHConnection:
                 password=password,
                 timeout=timeout,
                 allow_agent=False,
-                look_for_keys=False
+                look_for_keys=False,
+                compress=compress
             )
             
+            # Channels opened from here on (SFTP, shell) use the larger window
+            transport = self.client.get_transport()
+            if transport is not None:
+                transport.default_window_size = _CHANNEL_WINDOW_SIZE
+                transport.set_keepalive(_KEEPALIVE_INTERVAL)
+            
             # Test connection
             stdin, stdout, stderr = self.client.exec_command("echo 'connection_test'", timeout=5)
-            result = stdout.read().decode().strip()
+            # Compare the raw bytes; nothing else reads the probe output
+            result = stdout.read().strip()
             
-            if result == "connection_test":
+            if result == b"connection_test":
                 self.connected = True
+                self._last_ping = time.monotonic()
                 self.logger.info("SSH connection established successfully")
                 return True
             else:
@@ -66,6 +178,14 @@ class SSHConnection:
     def disconnect(self):
         """Close SSH connection"""
         try:
+            self._close_shell()
+            self._close_libssh2()
+            self._ensured_dirs.clear()
+            self._has_openssl = None
+            self._sftp_unavailable = False
+            if self._sftp:
+                self._sftp.close()
+                self._sftp = None
             if self.client:
                 self.client.close()
                 self.client = None
@@ -77,40 +197,203 @@ class SSHConnection:
         except Exception as e:
             self.logger.error(f"Error closing connection: {e}")
     
+    def _get_libssh2(self):
+        """Return the libssh2 transfer session, opening it on first use.
+        
+        Returns None when ssh2-python is missing or the session could not be opened;
+        a failed attempt is not repeated until the next connect.
+        """
+        if self._libssh2 is not None:
+            return self._libssh2
+        if Libssh2Sftp is None or self._libssh2_tried or not self.connected:
+            return None
+        
+        with self._libssh2_lock:
+            # Another transfer may have opened (or given up on) it while we waited
+            if self._libssh2 is not None or self._libssh2_tried:
+                return self._libssh2
+            
+            self._libssh2_tried = True
+            try:
+                session = Libssh2Sftp(chunk_size=_TRANSFER_CHUNK_SIZE)
+                session.connect(self.hostname, self.username, self.password, self.port, self._connect_timeout)
+                self._libssh2 = session
+                self._backend = "libssh2"
+                return session
+            except Exception as e:
+                self.logger.error(f"libssh2 session failed, using paramiko for transfers: {e}")
+                return None
+    
+    def _drop_libssh2(self):
+        """Stop using a libssh2 session that failed a transfer, without retrying it this session"""
+        if self._libssh2 is not None:
+            self._libssh2.close()
+            self._libssh2 = None
+        self._backend = "paramiko"
+    
+    def _close_libssh2(self):
+        """Close the libssh2 session and fall back to paramiko"""
+        self._drop_libssh2()
+        self._libssh2_tried = False
+    
     def is_connected(self) -> bool:
-        """Check if connection is still active"""
+        """Check if connection is still active (in-process transport state, no round trip)"""
         if not self.connected or not self.client:
             return False
         
-        try:
-            # Sử dụng biến trung gian để Pylance hiểu rằng client không phải None
-            client = self.client  # Tại đây, type của client là paramiko.SSHClient
-            
-            stdin, stdout, stderr = client.exec_command("echo 'keepalive'", timeout=3)
-            result = stdout.read().decode().strip()
-            return result == "keepalive"
-        except:
+        transport = self.client.get_transport()
+        if transport is None or not transport.is_active() or not transport.is_authenticated():
             self.connected = False
             return False
+        return True
     
-    def execute_command(self, command: str, timeout: int = 30) -> Tuple[bool, str, str]:
-        """Execute a command on the remote server with auto-retry"""
+    def ping(self, max_age: float = _PING_INTERVAL) -> bool:
+        """Confirm the device still answers, probing at most once every max_age seconds"""
+        if not self.is_connected():
+            return False
+        
+        now = time.monotonic()
+        if now - self._last_ping < max_age:
+            return True
+        
+        try:
+            # Probe through the persistent shell instead of opening a new channel
+            success, stdout, _ = self._execute_in_shell_bytes("echo 'keepalive'", timeout=3)
+            if success and stdout.strip() == b"keepalive":
+                self._last_ping = now
+                return True
+        except:
+            pass
+        
+        self.connected = False
+        return False
+    
+    def _get_shell(self) -> paramiko.Channel:
+        """Return the persistent shell channel, opening a new one if needed"""
+        if self._shell is None or self._shell.closed or self._shell.exit_status_ready():
+            transport = self.client.get_transport() if self.client else None
+            if transport is None or not transport.is_active():
+                raise RuntimeError("Not connected")
+            
+            # No PTY: no prompt, no echo, and stderr stays on its own stream
+            shell = transport.open_session()
+            shell.invoke_shell()
+            # Dropbear starts a login shell, so /etc/profile prints the banner/MOTD
+            # first; one throwaway round-trip consumes it before any real command
+            try:
+                shell.settimeout(_SHELL_MAX_TIMEOUT)
+                self._shell_round_trip(shell, "true")
+            except Exception:
+                shell.close()
+                raise
+            self._shell = shell
+        return self._shell
+    
+    @staticmethod
+    def _shell_round_trip(shell: paramiko.Channel, command: str) -> Tuple[bool, bytes, bytes]:
+        """Send one framed command to the shell and read its output up to the sentinels"""
+        # Subshell keeps cd/exit from leaking; detached stdin stops the
+        # command from consuming the lines that follow it
+        shell.sendall(
+            f"( {command}\n) </dev/null; echo \"__RC_$?__{_SHELL_SENTINEL}\"; "
+            f"echo \"{_SHELL_SENTINEL}\" >&2\n".encode('utf-8')
+        )
+        
+        # Drain both streams as data arrives: stdout and stderr share the channel's
+        # flow-control window, so unread stderr could otherwise stall the command
+        stdout = bytearray()
+        stderr = bytearray()
+        match = None
+        deadline = time.monotonic() + (shell.gettimeout() or _SHELL_MAX_TIMEOUT)
+        while match is None or not stderr.endswith(_SHELL_STDERR_END):
+            if shell.recv_stderr_ready():
+                stderr += shell.recv_stderr(65536)
+            elif shell.recv_ready():
+                # Only the new data (plus room for a split marker) needs searching
+                start = max(0, len(stdout) - 64)
+                stdout += shell.recv(65536)
+                match = match or _SHELL_STATUS.search(stdout, start)
+            elif shell.closed or shell.eof_received:
+                raise EOFError("Shell session closed")
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise socket.timeout("Shell command timed out")
+                select.select([shell], [], [], remaining)
+        
+        return int(match.group(1)) == 0, bytes(stdout[:match.start()]), bytes(stderr[:-len(_SHELL_STDERR_END)])
+    
+    def _close_shell(self):
+        """Close the persistent shell channel"""
+        if self._shell is not None:
+            try:
+                self._shell.close()
+            except Exception:
+                pass
+            self._shell = None
+    
+    def _execute_in_shell(self, command: str, timeout: int) -> Tuple[bool, str, str]:
+        """Run a short command through the persistent shell session"""
+        success, stdout, stderr = self._execute_in_shell_bytes(command, timeout)
+        return success, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
+    
+    def _execute_in_shell_bytes(self, command: str, timeout: int) -> Tuple[bool, bytes, bytes]:
+        """Run a short command through the persistent shell session, returning raw output"""
+        with self._shell_lock:
+            try:
+                shell = self._get_shell()
+            except Exception as e:
+                raise _CommandNotStarted(e) from e
+            shell.settimeout(timeout)
+            try:
+                return self._shell_round_trip(shell, command)
+            except Exception:
+                # The shell is in an unknown state; start a fresh one next time
+                self._close_shell()
+                raise
+    
+    def execute_command(self, command: str, timeout: int = 30, use_shell: Optional[bool] = None,
+                        idempotent: bool = False) -> Tuple[bool, str, str]:
+        """Execute a command on the remote server with auto-retry.
+        
+        Short single-line commands go through the persistent shell; multi-line
+        or long-running ones (timeout above _SHELL_MAX_TIMEOUT) get their own exec channel.
+        A command that already reached the device is only re-run after a reconnect
+        when idempotent is True.
+        """
+        success, stdout, stderr = self.execute_command_bytes(command, timeout, use_shell, idempotent)
+        return success, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
+    
+    def execute_command_bytes(self, command: str, timeout: int = 30, use_shell: Optional[bool] = None,
+                              idempotent: bool = False) -> Tuple[bool, bytes, bytes]:
+        """Same as execute_command but returns stdout/stderr as raw bytes, without decoding"""
+        if use_shell is None:
+            use_shell = timeout <= _SHELL_MAX_TIMEOUT and "\n" not in command
+        
         retry_count = 0
         max_retries = 2  # Số lần thử lại tối đa
+        total_backoff = 0.0
         
         while retry_count <= max_retries:
-            if not self.is_connected():
-                return False, "", "Not connected"
+            # A dropped transport means the command has not started, so reconnecting is safe
+            if not self.is_connected() and not self._reconnect():
+                return False, b"", b"Not connected"
             
             try:
                 client = self.client
                 if client is None:
-                    return False, "", "Client is None"
+                    return False, b"", b"Client is None"
+                
+                if use_shell:
+                    return self._execute_in_shell_bytes(command, timeout)
                     
-                stdin, stdout, stderr = client.exec_command(command, timeout=timeout)
+                try:
+                    stdin, stdout, stderr = client.exec_command(command, timeout=timeout)
+                except Exception as e:
+                    raise _CommandNotStarted(e) from e
                 
-                stdout_data = stdout.read().decode('utf-8', errors='replace')
-                stderr_data = stderr.read().decode('utf-8', errors='replace')
+                stdout_data = stdout.read()
+                stderr_data = stderr.read()
                 exit_code = stdout.channel.recv_exit_status()
                 
                 success = exit_code == 0
@@ -118,62 +401,365 @@ class SSHConnection:
                 
             except Exception as e:
                 retry_count += 1
-                error_msg = f"Command execution error: {e}"
+                not_started = isinstance(e, _CommandNotStarted)
+                cause = e.__cause__ if not_started else e
+                reason = str(cause) or type(cause).__name__
+                error_msg = f"Command execution error: {reason}"
                 
-                # Nếu đã hết số lần thử, hoặc lỗi khác timeout, trả về lỗi
-                if retry_count > max_retries or "timed out" not in str(e).lower():
+                # Chỉ thử lại với lỗi kết nối/timeout, và chỉ khi lệnh chưa chạy
+                # trên thiết bị hoặc người gọi cho phép chạy lại
+                retryable = isinstance(cause, _RETRYABLE_ERRORS) and (not_started or idempotent)
+                if retry_count > max_retries or not retryable:
                     self.logger.error(error_msg)
-                    return False, "", str(e)
+                    return False, b"", reason.encode('utf-8', errors='replace')
                 
-                # Đánh dấu kết nối đã mất để kích hoạt việc kết nối lại
+                # Đánh dấu kết nối đã mất, chờ theo cấp số nhân rồi kết nối lại
                 self.connected = False
-                self.logger.warning(f"{error_msg} - Retrying ({retry_count}/{max_retries})...")
-                time.sleep(2)  # Đợi một chút trước khi thử lại
+                delay = min(_RETRY_BASE_DELAY * 2 ** (retry_count - 1), _RETRY_MAX_DELAY)
+                total_backoff += delay
+                self.logger.warning(
+                    f"{error_msg} - Retrying ({retry_count}/{max_retries}) in {delay:.1f}s "
+                    f"(total backoff {total_backoff:.1f}s)..."
+                )
+                time.sleep(delay)
+                self._reconnect()
+    
+    def _reconnect(self) -> bool:
+        """Close the current transport and connect again with the saved credentials"""
+        hostname, username, password, port = self.hostname, self.username, self.password, self.port
+        if not hostname or not username or password is None:
+            return False
+        
+        self.logger.info(f"Reconnecting to {hostname}:{port}")
+        return self.connect(hostname, username, password, port)
     
-    def ensure_remote_directory(self, remote_dir: str) -> bool:
-        """Ensure remote directory exists"""
+    def execute_commands_parallel(self, commands: List[str], timeout: int = 30) -> List[Tuple[bool, str, str]]:
+        """Run independent commands at the same time, each on its own channel of the shared transport.
+        
+        Returns (success, stdout, stderr) for each command in input order, so a batch of
+        round-trip-bound commands costs about one round trip instead of one per command.
+        """
+        if not commands:
+            return []
+        if not self.is_connected():
+            return [(False, "", "Not connected")] * len(commands)
+        
+        channels = []
         try:
-            success, stdout, stderr = self.execute_command(f"mkdir -p '{remote_dir}'")
-            if not success:
-                self.logger.error(f"Failed to create directory {remote_dir}: {stderr}")
-                return False
+            for command in commands:
+                channels.append(self._open_exec_channel(command, timeout))
+        except Exception as e:
+            for channel in channels:
+                channel.close()
+            self.logger.error(f"Parallel command setup error: {e}")
+            return [(False, "", str(e))] * len(commands)
+        
+        stdout = [bytearray() for _ in channels]
+        stderr = [bytearray() for _ in channels]
+        exit_codes = [None] * len(channels)
+        by_fd = {channel.fileno(): index for index, channel in enumerate(channels)}
+        deadline = time.monotonic() + timeout
+        
+        try:
+            while by_fd:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                
+                ready, _, _ = select.select(list(by_fd), [], [], remaining)
+                for fd in ready:
+                    index = by_fd[fd]
+                    channel = channels[index]
+                    while channel.recv_ready():
+                        stdout[index] += channel.recv(65536)
+                    while channel.recv_stderr_ready():
+                        stderr[index] += channel.recv_stderr(65536)
+                    
+                    if channel.exit_status_ready() and not channel.recv_ready() and not channel.recv_stderr_ready():
+                        exit_codes[index] = channel.recv_exit_status()
+                        del by_fd[fd]
+        finally:
+            for channel in channels:
+                channel.close()
+        
+        results = []
+        for index in range(len(channels)):
+            out = stdout[index].decode('utf-8', errors='replace')
+            err = stderr[index].decode('utf-8', errors='replace')
+            if exit_codes[index] is None:
+                results.append((False, out, err or "timed out"))
+            else:
+                results.append((exit_codes[index] == 0, out, err))
+        return results
+    
+    def execute_batch(self, commands: List[str], timeout: int = 30) -> Tuple[List[Tuple[bool, str]], str]:
+        """Run several commands through a single exec channel.
+        
+        Returns (success, stdout) for each command in order plus the combined stderr.
+        Commands without a reported status (e.g. the connection dropped) count as failed.
+        """
+        script = "".join(f"{command}; echo '{_BATCH_SEPARATOR}'$?; " for command in commands)
+        _, stdout, stderr = self.execute_command(script, timeout=timeout)
+        
+        parts = _BATCH_STATUS.split(stdout)
+        results = [(parts[i + 1] == "0", parts[i].strip()) for i in range(0, len(parts) - 1, 2)]
+        results.extend((False, "") for _ in range(len(commands) - len(results)))
+        return results, stderr
+    
+    def _ensure_remote_directory(self, remote_dir: str, check_path: Optional[str] = None,
+                                 force: bool = False) -> Tuple[bool, int]:
+        """Create remote_dir and optionally stat check_path in one exec.
+        
+        Directories already ensured this session are skipped unless force is set.
+        Returns (directory ready, size of check_path or -1 if it does not exist).
+        """
+        if remote_dir in self._ensured_dirs and not force:
+            remote_dir = ''
+        
+        commands = []
+        if remote_dir and remote_dir != '/':
+            commands += [f"mkdir -p '{remote_dir}'", f"chmod 755 '{remote_dir}'"]
+        if check_path:
+            commands.append(f"stat -c%s '{check_path}' 2>/dev/null")
+        if not commands:
+            return True, -1
+        
+        try:
+            results, stderr = self.execute_batch(commands)
             
-            success, stdout, stderr = self.execute_command(f"chmod 755 '{remote_dir}'")
-            if not success:
-                self.logger.warning(f"Failed to set permissions on {remote_dir}: {stderr}")
+            if remote_dir and remote_dir != '/':
+                (mkdir_ok, _), (chmod_ok, _) = results[0], results[1]
+                if not mkdir_ok:
+                    self.logger.error(f"Failed to create directory {remote_dir}: {stderr}")
+                    return False, -1
+                if not chmod_ok:
+                    self.logger.warning(f"Failed to set permissions on {remote_dir}: {stderr}")
+                self.logger.info(f"Directory ensured: {remote_dir}")
+                self._ensured_dirs.add(remote_dir)
             
-            self.logger.info(f"Directory ensured: {remote_dir}")
-            return True
+            size = -1
+            if check_path:
+                stat_ok, output = results[-1]
+                if stat_ok and output.isdigit():
+                    size = int(output)
+            return True, size
                 
         except Exception as e:
             self.logger.error(f"Error ensuring directory {remote_dir}: {e}")
-            return False
+            return False, -1
+    
+    def ensure_remote_directory(self, remote_dir: str, force: bool = False) -> bool:
+        """Ensure remote directory exists (cached per session unless force is set)"""
+        return self._ensure_remote_directory(remote_dir, force=force)[0]
+    
+    def prepare_remote_file(self, remote_path: str) -> Tuple[bool, int]:
+        """Ensure the parent directory of remote_path exists and return the size of
+        any existing file there (-1 if none), using a single exec"""
+        return self._ensure_remote_directory(os.path.dirname(remote_path), check_path=remote_path)
 
+    def _open_exec_channel(self, command: str, timeout: int = 30) -> paramiko.Channel:
+        """Start command on a new session channel so its stdin/stdout can be streamed"""
+        transport = self.client.get_transport() if self.client else None
+        if transport is None or not transport.is_active():
+            raise RuntimeError("Not connected")
+        
+        channel = transport.open_session()
+        channel.settimeout(timeout)
+        channel.exec_command(command)
+        return channel
+    
+    def _get_sftp(self, timeout: int = 60) -> paramiko.SFTPClient:
+        """Return the persistent SFTP session, reopening it if its channel has closed"""
+        if self._sftp_unavailable:
+            raise RuntimeError("SFTP subsystem unavailable on this device")
+        if self._sftp is None or self._sftp.get_channel().closed:
+            if self.client is None:
+                raise RuntimeError("Not connected")
+            try:
+                self._sftp = self.client.open_sftp()
+            except paramiko.SSHException:
+                # Subsystem request refused: remember it until the next connect
+                self._sftp_unavailable = True
+                raise
+        self._sftp.get_channel().settimeout(timeout)
+        return self._sftp
+    
     def upload_file_via_ssh_exec(self, local_path: str, remote_path: str) -> bool:
-        """Upload file using established SSH connection and base64 encoding (best method)"""
+        """Upload file by streaming it over SFTP (best method), base64 over exec if SFTP is unavailable"""
         try:
             if not os.path.exists(local_path):
                 self.logger.error(f"Local file not found: {local_path}")
                 return False
-
-            # Read file as binary
-            with open(local_path, 'rb') as f:
-                file_content = f.read()
             
-            # Base64 encode content
-            encoded_content = base64.b64encode(file_content).decode('utf-8')
+            # Device already refused SFTP this session: skip SFTP and libssh2 entirely
+            if self._sftp_unavailable:
+                return self.upload_file_via_base64(local_path, remote_path)
             
-            # Create target directory if needed
-            remote_dir = os.path.dirname(remote_path)
-            if remote_dir and remote_dir != '/':
-                if not self.ensure_remote_directory(remote_dir):
-                    return False
+            try:
+                sftp = self._get_sftp()
+            except Exception as e:
+                self.logger.warning(f"SFTP unavailable, using base64 upload: {e}")
+                return self.upload_file_via_base64(local_path, remote_path)
+            
+            # Create target directory and check for an existing file in one exec
+            ready, existing_size = self.prepare_remote_file(remote_path)
+            if not ready:
+                return False
+            if existing_size >= 0:
+                self.logger.info(f"Overwriting existing remote file {remote_path} ({existing_size} bytes)")
+            
+            libssh2 = self._get_libssh2()
+            if libssh2 is not None:
+                try:
+                    libssh2.put(local_path, remote_path)
+                    self.logger.info(f"File uploaded via libssh2 SFTP: {local_path} -> {remote_path}")
+                    return True
+                except Exception as e:
+                    self.logger.warning(f"libssh2 upload failed, using paramiko for this session: {e}")
+                    self._drop_libssh2()
+            
+            self._sftp_put(sftp, local_path, remote_path)
+            self.logger.info(f"File uploaded via SFTP: {local_path} -> {remote_path}")
+            return True
+                    
+        except Exception as e:
+            self.logger.error(f"SFTP upload error: {e}")
+            return False
+    
+    @staticmethod
+    def _sftp_put(sftp: paramiko.SFTPClient, local_path: str, remote_path: str):
+        """Stream a local file to remote_path over the given SFTP session"""
+        # Fixed-size chunks; pipelining keeps several WRITE requests in flight
+        with open(local_path, 'rb') as local_file, sftp.open(remote_path, 'wb') as remote_file:
+            remote_file.set_pipelined(True)
+            for chunk in iter(lambda: local_file.read(_TRANSFER_CHUNK_SIZE), b''):
+                remote_file.write(chunk)
+    
+    def upload_files(self, pairs: List[Tuple[str, str]], workers: int = 4) -> List[bool]:
+        """Upload several (local_path, remote_path) pairs concurrently.
+        
+        Each worker opens its own SFTP channel on the shared transport. Files the
+        workers could not send go through upload_file's fallback chain, with PSCP
+        run as one batch.
+        Returns the success of each pair, in order.
+        """
+        if not pairs:
+            return []
+        
+        pairs = [(local_path, _norm(remote_path)) for local_path, remote_path in pairs]
+        results = [False] * len(pairs)
+        
+        # Create each remote directory once instead of once per file
+        remote_dirs = {os.path.dirname(remote_path) for _, remote_path in pairs} - {'', '/'}
+        failed_dirs = {d for d in sorted(remote_dirs) if not self.ensure_remote_directory(d)}
+        
+        jobs = queue.Queue()
+        if not self._sftp_unavailable:
+            for index, (local_path, remote_path) in enumerate(pairs):
+                if os.path.dirname(remote_path) not in failed_dirs:
+                    jobs.put((index, local_path, remote_path))
+        
+        def worker():
+            try:
+                client = self.client
+                if client is None:
+                    return
+                sftp = client.open_sftp()
+            except Exception as e:
+                self.logger.warning(f"Could not open SFTP channel for parallel upload: {e}")
+                return
+            
+            try:
+                while True:
+                    try:
+                        index, local_path, remote_path = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        self._sftp_put(sftp, local_path, remote_path)
+                        results[index] = True
+                        self.logger.info(f"File uploaded via SFTP: {local_path} -> {remote_path}")
+                    except Exception as e:
+                        self.logger.warning(f"Parallel SFTP upload failed for {local_path}: {e}")
+            finally:
+                sftp.close()
+        
+        worker_count = min(workers, jobs.qsize())
+        if worker_count > 0:
+            with ThreadPoolExecutor(max_workers=worker_count) as pool:
+                for _ in range(worker_count):
+                    pool.submit(worker)
+        
+        # Files the workers did not send take upload_file's fallback chain, with the
+        # PSCP step run for all of them at once instead of one process per file
+        pending = [i for i, (_, remote_path) in enumerate(pairs)
+                   if not results[i] and os.path.dirname(remote_path) not in failed_dirs]
+        for index in pending:
+            local_path, remote_path = pairs[index]
+            target_path = self._shared_mount_target(remote_path)
+            if target_path and self.upload_file_via_shared_mount(local_path, target_path):
+                results[index] = True
+            elif self.upload_file_via_ssh_exec(local_path, remote_path):
+                results[index] = True
+        
+        pending = [i for i in pending if not results[i]]
+        if pending:
+            outcomes = self.upload_files_via_pscp([pairs[i] for i in pending], workers)
+            for index, success in zip(pending, outcomes):
+                results[index] = success
+        
+        for index in pending:
+            if not results[index]:
+                results[index] = self.upload_file_via_ssh_cat(*pairs[index])
+                if not results[index]:
+                    self.logger.error(f"All upload methods failed for {pairs[index][0]}")
+        
+        return results
+    
+    def _base64_decode_command(self) -> str:
+        """Remote base64 decoder: openssl (faster EVP decoder) when installed, else busybox base64"""
+        if self._has_openssl is None:
+            success, stdout, _ = self.execute_command_bytes("which openssl 2>/dev/null")
+            self._has_openssl = success and stdout.strip() != b""
+        return "openssl base64 -d -A" if self._has_openssl else "base64 -d"
+    
+    def upload_file_via_base64(self, local_path: str, remote_path: str) -> bool:
+        """Upload file using established SSH connection and base64 encoding (SFTP fallback)"""
+        try:
+            if not os.path.exists(local_path):
+                self.logger.error(f"Local file not found: {local_path}")
+                return False
+
+            # Create target directory and check for an existing file in one exec
+            ready, existing_size = self.prepare_remote_file(remote_path)
+            if not ready:
+                return False
+            if existing_size >= 0:
+                self.logger.info(f"Overwriting existing remote file {remote_path} ({existing_size} bytes)")
             
-            # Command to decode and create file on device
-            decode_cmd = f"echo '{encoded_content}' | base64 -d > '{remote_path}'"
+            # Both decoders take the same unwrapped base64 on stdin
+            decode_cmd = self._base64_decode_command()
             
-            # Execute through existing SSH connection
-            success, stdout, stderr = self.execute_command(decode_cmd, timeout=60)
+            if os.path.getsize(local_path) < _BASE64_INLINE_LIMIT:
+                # Small file: one command on the already-open shell, no new channel
+                with open(local_path, 'rb') as f:
+                    encoded_content = base64.b64encode(f.read()).decode('ascii')
+                success, _, stderr = self.execute_command(
+                    f"echo '{encoded_content}' | {decode_cmd} > '{remote_path}'"
+                )
+            else:
+                # Feed the encoded file into a single remote decoder through its stdin
+                channel = self._open_exec_channel(f"{decode_cmd} > '{remote_path}'", timeout=60)
+                try:
+                    with open(local_path, 'rb') as f:
+                        for chunk in iter(lambda: f.read(_BASE64_CHUNK_SIZE), b''):
+                            channel.sendall(base64.b64encode(chunk))
+                    channel.shutdown_write()
+                    
+                    stderr = channel.makefile_stderr('rb').read().decode('utf-8', errors='replace')
+                    success = channel.recv_exit_status() == 0
+                finally:
+                    channel.close()
             
             if success:
                 self.logger.info(f"File uploaded via SSH exec: {local_path} -> {remote_path}")
@@ -199,44 +785,82 @@ class SSHConnection:
                 if not self.ensure_remote_directory(remote_dir):
                     return False
             
-            # Prepare for PSCP
-            remote_target = f"{self.username}@{self.hostname}:{remote_path}"
-            
-            try:
-                pscp_cmd = [
-                    "pscp", 
-                    "-scp",          # Use SCP protocol
-                    "-batch",        # Non-interactive mode
-                    "-pw", self.password,  # Password from memory
-                    local_path, 
-                    remote_target
-                ]
+            return self._run_pscp_upload(local_path, remote_path)
                 
-                result = subprocess.run(
-                    pscp_cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                
-                if result.returncode == 0:
-                    self.logger.info(f"File uploaded via PSCP: {local_path} -> {remote_path}")
-                    return True
-                else:
-                    self.logger.warning(f"PSCP upload failed: {result.stderr}")
-                    return False
-                    
-            except FileNotFoundError:
-                self.logger.warning("PSCP not found - please install PuTTY tools")
-                return False
-            except Exception as e:
-                self.logger.warning(f"PSCP error: {e}")
+        except Exception as e:
+            self.logger.error(f"PSCP setup error: {e}")
+            return False
+    
+    def _run_pscp_upload(self, local_path: str, remote_path: str) -> bool:
+        """Run one pscp process uploading local_path to remote_path"""
+        # Prepare for PSCP
+        remote_target = f"{self.username}@{self.hostname}:{remote_path}"
+        
+        try:
+            pscp_cmd = [
+                "pscp", 
+                "-scp",          # Use SCP protocol
+                "-batch",        # Non-interactive mode
+                "-pw", self.password,  # Password from memory
+                local_path, 
+                remote_target
+            ]
+            
+            result = subprocess.run(
+                pscp_cmd,
+                capture_output=True,
+                text=True,
+                timeout=60
+            )
+            
+            if result.returncode == 0:
+                self.logger.info(f"File uploaded via PSCP: {local_path} -> {remote_path}")
+                return True
+            else:
+                self.logger.warning(f"PSCP upload failed: {result.stderr}")
                 return False
                 
+        except FileNotFoundError:
+            self.logger.warning("PSCP not found - please install PuTTY tools")
+            return False
         except Exception as e:
-            self.logger.error(f"PSCP setup error: {e}")
+            self.logger.warning(f"PSCP error: {e}")
             return False
     
+    def upload_files_via_pscp(self, pairs: List[Tuple[str, str]], workers: int = 4) -> List[bool]:
+        """Upload several (local_path, remote_path) pairs with up to `workers` pscp
+        processes running at once, retrying failed files once.
+        Returns the success of each pair, in order."""
+        if not pairs:
+            return []
+        
+        results = [False] * len(pairs)
+        if not self.hostname or not self.username or not self.password:
+            self.logger.error("Connection details not available for PSCP")
+            return results
+        if shutil.which("pscp") is None:
+            self.logger.warning("PSCP not found - please install PuTTY tools")
+            return results
+        
+        pairs = [(local_path, _norm(remote_path)) for local_path, remote_path in pairs]
+        
+        # Create each remote directory once instead of once per file
+        remote_dirs = {os.path.dirname(remote_path) for _, remote_path in pairs} - {'', '/'}
+        failed_dirs = {d for d in sorted(remote_dirs) if not self.ensure_remote_directory(d)}
+        pending = [i for i, (_, remote_path) in enumerate(pairs) if os.path.dirname(remote_path) not in failed_dirs]
+        
+        # Process start-up and the SSH handshake of each pscp overlap with the others' transfers
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as pool:
+            for _ in range(2):
+                outcomes = pool.map(lambda i: self._run_pscp_upload(*pairs[i]), pending)
+                for index, success in zip(pending, list(outcomes)):
+                    results[index] = success
+                pending = [i for i in pending if not results[i]]
+                if not pending:
+                    break
+        
+        return results
+    
     def upload_file_via_ssh_cat(self, local_path: str, remote_path: str) -> bool:
         """Upload text file using SSH cat (fallback method for text files)"""
         try:
@@ -268,14 +892,46 @@ class SSHConnection:
             self.logger.error(f"SSH cat upload error: {e}")
             return False
     
+    def _shared_mount_target(self, remote_path: str) -> Optional[str]:
+        """Local path for remote_path if it lies under a shared mount, else None"""
+        for remote_prefix, local_prefix in self.shared_mount_map.items():
+            remote_prefix = remote_prefix.rstrip('/')
+            if remote_path == remote_prefix or remote_path.startswith(remote_prefix + '/'):
+                relative = remote_path[len(remote_prefix):].lstrip('/')
+                return os.path.join(local_prefix, *relative.split('/')) if relative else local_prefix
+        return None
+    
+    def upload_file_via_shared_mount(self, local_path: str, target_path: str) -> bool:
+        """Copy file straight onto a share the device also mounts, bypassing SSH"""
+        try:
+            target_dir = os.path.dirname(target_path)
+            if target_dir:
+                os.makedirs(target_dir, exist_ok=True)
+            shutil.copyfile(local_path, target_path)
+            
+            # Flush the device's view of the share before tests read the file
+            if self.is_connected():
+                self.execute_command("sync")
+            
+            self.logger.info(f"File copied via shared mount: {local_path} -> {target_path}")
+            return True
+        except Exception as e:
+            self.logger.warning(f"Shared mount copy failed: {e}")
+            return False
+    
     def upload_file(self, local_path: str, remote_path: str) -> bool:
         """Upload file using the best available method for Windows"""
         self.logger.info(f"Attempting to upload: {local_path} -> {remote_path}")
         
         # Ensure proper remote path format
-        remote_path = remote_path.replace('\\', '/')
+        remote_path = _norm(remote_path)
         
-        # Method 1: SSH exec with base64 (preferred - uses existing connection)
+        # Method 0: direct copy when the target directory is shared with this machine
+        target_path = self._shared_mount_target(remote_path)
+        if target_path and self.upload_file_via_shared_mount(local_path, target_path):
+            return True
+        
+        # Method 1: SFTP over the existing connection (base64 exec if SFTP is disabled)
         if self.upload_file_via_ssh_exec(local_path, remote_path):
             return True
         
@@ -290,6 +946,40 @@ class SSHConnection:
         self.logger.error("All upload methods failed")
         return False
     
+    def download_file_via_sftp(self, remote_path: str, local_path: str) -> bool:
+        """Download file over the persistent SFTP session (best method)"""
+        if self._sftp_unavailable:
+            return False
+        
+        libssh2 = self._get_libssh2()
+        if libssh2 is not None:
+            try:
+                libssh2.get(remote_path, local_path)
+                self.logger.info(f"File downloaded via libssh2 SFTP: {remote_path} -> {local_path}")
+                return True
+            except Exception as e:
+                self.logger.warning(f"libssh2 download failed, using paramiko for this session: {e}")
+                self._drop_libssh2()
+        
+        try:
+            sftp = self._get_sftp()
+            
+            # Ensure local directory exists
+            local_dir = os.path.dirname(local_path)
+            if local_dir:
+                os.makedirs(local_dir, exist_ok=True)
+            
+            # getfo prefetches ahead and writes the raw bytes straight to the file
+            with open(local_path, 'wb') as local_file:
+                sftp.getfo(remote_path, local_file)
+            
+            self.logger.info(f"File downloaded via SFTP: {remote_path} -> {local_path}")
+            return True
+            
+        except Exception as e:
+            self.logger.warning(f"SFTP download failed: {e}")
+            return False
+    
     def download_file_via_ssh_exec(self, remote_path: str, local_path: str) -> bool:
         """Download file using established SSH connection and base64 encoding (best method)"""
         try:
@@ -307,27 +997,32 @@ class SSHConnection:
                 self.logger.error(f"Remote file not found: {remote_path}")
                 return False
             
-            # Get file content using base64 to support binary files
-            cmd = f"cat '{remote_path}' | base64"
-            success, stdout, stderr = self.execute_command(cmd, timeout=60)
+            # Get file content using base64 to support binary files, decoding as it arrives
+            channel = self._open_exec_channel(f"cat '{remote_path}' | base64", timeout=60)
+            try:
+                pending = b""
+                with open(local_path, 'wb') as f:
+                    for data in iter(lambda: channel.recv(_TRANSFER_CHUNK_SIZE), b''):
+                        # Strip line wrapping and decode only whole 4-byte groups
+                        pending += data.translate(None, b"\r\n")
+                        usable = len(pending) - len(pending) % 4
+                        f.write(base64.b64decode(pending[:usable]))
+                        pending = pending[usable:]
+                    if pending:
+                        f.write(base64.b64decode(pending))
+                
+                stderr = channel.makefile_stderr('rb').read().decode('utf-8', errors='replace')
+                exit_code = channel.recv_exit_status()
+            finally:
+                channel.close()
             
-            if not success:
+            if exit_code != 0:
                 self.logger.error(f"Failed to get file content: {stderr}")
+                os.remove(local_path)
                 return False
             
-            # Decode base64 content
-            try:
-                file_content = base64.b64decode(stdout)
-                
-                # Write to local file
-                with open(local_path, 'wb') as f:
-                    f.write(file_content)
-                    
-                self.logger.info(f"File downloaded via SSH exec: {remote_path} -> {local_path}")
-                return True
-            except Exception as e:
-                self.logger.error(f"Failed to decode file content: {e}")
-                return False
+            self.logger.info(f"File downloaded via SSH exec: {remote_path} -> {local_path}")
+            return True
                 
         except Exception as e:
             self.logger.error(f"SSH exec download error: {e}")
@@ -386,7 +1081,8 @@ class SSHConnection:
     def download_file_via_ssh_cat(self, remote_path: str, local_path: str) -> bool:
         """Download text file using SSH cat (fallback method for text files)"""
         try:
-            success, content, stderr = self.execute_command(f"cat '{remote_path}'")
+            # Raw bytes: no UTF-8 decode/re-encode and no newline translation
+            success, content, stderr = self.execute_command_bytes(f"cat '{remote_path}'")
             
             if success:
                 # Ensure local directory exists
@@ -395,13 +1091,13 @@ class SSHConnection:
                     os.makedirs(local_dir, exist_ok=True)
                 
                 # Write content to local file
-                with open(local_path, 'w', encoding='utf-8') as f:
+                with open(local_path, 'wb') as f:
                     f.write(content)
                 
                 self.logger.info(f"File downloaded via SSH cat: {remote_path} -> {local_path}")
                 return True
             else:
-                self.logger.error(f"SSH cat download failed: {stderr}")
+                self.logger.error(f"SSH cat download failed: {stderr.decode('utf-8', errors='replace')}")
                 return False
                 
         except Exception as e:
@@ -413,40 +1109,65 @@ class SSHConnection:
         self.logger.info(f"Attempting to download: {remote_path} -> {local_path}")
         
         # Ensure proper path formats
-        remote_path = remote_path.replace('\\', '/')
-        local_path = local_path.replace('/', '\\')
+        remote_path = _norm(remote_path)
+        local_path = _norm_local(local_path)
+        
+        # Method 1: SFTP over the existing connection (preferred)
+        if self.download_file_via_sftp(remote_path, local_path):
+            return True
         
-        # Method 1: SSH exec with base64 (preferred - uses existing connection)
+        # Method 2: SSH exec with base64 (SFTP disabled on the device)
         if self.download_file_via_ssh_exec(remote_path, local_path):
             return True
         
-        # Method 2: PSCP (PuTTY tool)
+        # Method 3: PSCP (PuTTY tool)
         if self.download_file_via_pscp(remote_path, local_path):
             return True
         
-        # Method 3: SSH cat (text files only - fallback)
+        # Method 4: SSH cat (text files only - fallback)
         if self.download_file_via_ssh_cat(remote_path, local_path):
             return True
         
         self.logger.error("All download methods failed")
         return False
     
+    def _stat_file(self, remote_path: str) -> Tuple[bool, int]:
+        """Return (exists, size) for a remote file with one SFTP STAT request.
+        
+        Falls back to the stat command only when the SFTP subsystem is unavailable.
+        """
+        sftp = None
+        if not self._sftp_unavailable:
+            try:
+                sftp = self._get_sftp()
+            except Exception:
+                pass
+        
+        if sftp is not None:
+            try:
+                return True, sftp.stat(remote_path).st_size or 0
+            except IOError:
+                return False, 0
+        
+        # Output is at most a few ASCII digits: compare bytes, no decode
+        success, stdout, _ = self.execute_command_bytes(f"stat -c%s '{remote_path}' 2>/dev/null")
+        size = stdout.strip()
+        if success and size.isdigit():
+            return True, int(size)
+        return False, 0
+    
     def file_exists(self, remote_path: str) -> bool:
-        """Check if file exists using ls command"""
+        """Check if file exists"""
         try:
-            success, stdout, stderr = self.execute_command(f"ls '{remote_path}' 2>/dev/null")
-            return success and stdout.strip() != ""
+            return self._stat_file(remote_path)[0]
         except Exception as e:
             self.logger.error(f"Error checking file existence: {e}")
             return False
     
     def get_file_size(self, remote_path: str) -> int:
-        """Get file size using stat command"""
+        """Get file size (0 if the file does not exist)"""
         try:
-            success, stdout, stderr = self.execute_command(f"stat -c%s '{remote_path}' 2>/dev/null")
-            if success and stdout.strip().isdigit():
-                return int(stdout.strip())
-            return 0
+            return self._stat_file(remote_path)[1]
         except Exception as e:
             self.logger.error(f"Error getting file size: {e}")
-            return 0
\ No newline at end of file
+            return 0
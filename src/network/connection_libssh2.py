@@ -0,0 +1,71 @@
+# Module: connection_libssh2.py
+# Purpose: Optional libssh2 (ssh2-python) SFTP backend for large file transfers
+# Last updated: 2025-06-02 by juno-kyojin
+
+import os
+import socket
+import logging
+
+# ImportError here tells connection.py to stay on paramiko
+from ssh2.session import Session
+from ssh2.sftp import (
+    LIBSSH2_FXF_CREAT, LIBSSH2_FXF_READ, LIBSSH2_FXF_TRUNC, LIBSSH2_FXF_WRITE,
+    LIBSSH2_SFTP_S_IRGRP, LIBSSH2_SFTP_S_IROTH, LIBSSH2_SFTP_S_IRUSR, LIBSSH2_SFTP_S_IWUSR
+)
+
+# Quyền file mới trên thiết bị: 644
+_FILE_MODE = LIBSSH2_SFTP_S_IRUSR | LIBSSH2_SFTP_S_IWUSR | LIBSSH2_SFTP_S_IRGRP | LIBSSH2_SFTP_S_IROTH
+
+class Libssh2Sftp:
+    """SFTP transfers over a libssh2 session, with packet framing and ciphers in native code"""
+
+    def __init__(self, chunk_size: int = 1 << 20):
+        self.logger = logging.getLogger(__name__)
+        self.chunk_size = chunk_size
+        self._sock = None
+        self._session = None
+        self._sftp = None
+
+    def connect(self, hostname: str, username: str, password: str, port: int = 22, timeout: int = 10):
+        """Open a libssh2 session and its SFTP channel"""
+        self.close()
+
+        self._sock = socket.create_connection((hostname, port), timeout=timeout)
+        self._session = Session()
+        self._session.set_timeout(timeout * 1000)
+        self._session.handshake(self._sock)
+        self._session.userauth_password(username, password)
+        self._sftp = self._session.sftp_init()
+        self.logger.info(f"libssh2 SFTP session opened to {hostname}:{port}")
+
+    def put(self, local_path: str, remote_path: str):
+        """Upload local_path to remote_path"""
+        flags = LIBSSH2_FXF_CREAT | LIBSSH2_FXF_WRITE | LIBSSH2_FXF_TRUNC
+        with open(local_path, 'rb') as local_file, self._sftp.open(remote_path, flags, _FILE_MODE) as remote_file:
+            for chunk in iter(lambda: local_file.read(self.chunk_size), b''):
+                remote_file.write(chunk)
+
+    def get(self, remote_path: str, local_path: str):
+        """Download remote_path to local_path"""
+        local_dir = os.path.dirname(local_path)
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+
+        with self._sftp.open(remote_path, LIBSSH2_FXF_READ, LIBSSH2_SFTP_S_IRUSR) as remote_file, \
+                open(local_path, 'wb') as local_file:
+            for _, data in remote_file:
+                local_file.write(data)
+
+    def close(self):
+        """Close the session and its socket"""
+        try:
+            if self._session is not None:
+                self._session.disconnect()
+        except Exception as e:
+            self.logger.warning(f"Error closing libssh2 session: {e}")
+        finally:
+            if self._sock is not None:
+                self._sock.close()
+            self._sock = None
+            self._session = None
+            self._sftp = None
@@ -1,244 +1,510 @@
 # src/storage/database.py
 import os
+import pathlib
 import sqlite3
+import itertools
 import logging
+import threading
+import contextlib
 import time
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+
+def apply_perf_pragmas(conn: sqlite3.Connection):
+    """Apply the performance PRAGMAs shared by every history.db connection.
+    
+    Note: if page_size is ever tuned, WAL must be switched off and back on
+    around the PRAGMA page_size call or the new size will not take effect.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA cache_size=-65536")
+
+# SQLite's default host-parameter limit on older builds
+_MAX_VARIABLES = 999
+
+# WAL pages before SQLite checkpoints on commit, and seconds between background PASSIVE checkpoints
+_WAL_AUTOCHECKPOINT_PAGES = 1000
+_CHECKPOINT_INTERVAL = 60
+
+# execution_time is stored as INTEGER microseconds (1-4 byte records instead of an 8-byte REAL)
+_US_PER_SECOND = 1_000_000
+
+def _to_us(seconds) -> int:
+    """Seconds (float) -> integer microseconds for the execution_time_us columns"""
+    return int(round((seconds or 0) * _US_PER_SECOND))
+
+# Statements run on every call, kept as constants so the same string hits the statement cache
+_SQL_SAVE_SETTING = "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)"
+_SQL_ALL_SETTINGS = "SELECT key, value FROM settings"
+_SQL_LOG_CONNECTION = "INSERT INTO connection_log (ip_address, status, details) VALUES (?, ?, ?)"
+_SQL_INSERT_RESULT = """
+    INSERT INTO test_results (
+        file_name, file_size, test_count, send_status, overall_result,
+        affects_wan, affects_lan, execution_time_us, target_ip, target_username
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_RESULT_FILE_NAME = "SELECT file_name FROM test_results WHERE id = ?"
+# History rows with execution_time converted back to seconds
+_SQL_RESULT_SELECT = """
+    SELECT id, file_name, file_size, test_count, send_status, overall_result,
+        affects_wan, affects_lan, execution_time_us / 1000000.0 AS execution_time,
+        target_ip, target_username, timestamp
+    FROM test_results
+"""
+_SQL_RECENT_HISTORY = _SQL_RESULT_SELECT + " ORDER BY timestamp DESC LIMIT ?"
+_SQL_TEST_DETAILS = """
+    SELECT tc.service, tc.action, tc.status, tc.details, tc.execution_time_us
+    FROM test_cases tc
+    JOIN test_results tr ON tc.result_id = tr.id
+    WHERE tr.file_name = ?
+"""
+_SQL_TEST_DETAILS_AT = _SQL_TEST_DETAILS + " AND tr.timestamp LIKE ? ORDER BY tc.id"
+_SQL_TEST_DETAILS_ALL = _SQL_TEST_DETAILS + " ORDER BY tc.id"
+# Columns get_filtered_history accepts as filter keys
+_RESULT_COLUMNS = frozenset((
+    "id", "file_name", "file_size", "test_count", "send_status", "overall_result",
+    "affects_wan", "affects_lan", "execution_time_us", "target_ip", "target_username", "timestamp"
+))
+# Filter keys named after the columns history rows return, mapped to the stored column
+# and the conversion of the filter value (seconds -> microseconds)
+_RESULT_COLUMN_ALIASES = {
+    "execution_time": ("execution_time_us", _to_us),
+}
+# Indexes for the detail join, file-name lookups and newest-first history (with the status filter)
+_INDEXES = {
+    "idx_cases_result": "CREATE INDEX IF NOT EXISTS idx_cases_result ON test_cases(result_id)",
+    "idx_results_filename": "CREATE INDEX IF NOT EXISTS idx_results_filename ON test_results(file_name)",
+    "idx_ts_result": "CREATE INDEX IF NOT EXISTS idx_ts_result ON test_results(timestamp DESC, overall_result)"
+}
+# Earlier index made redundant by idx_ts_result (same leading column)
+_OBSOLETE_INDEXES = ("idx_results_timestamp",)
+# Full-table DELETEs without WHERE take SQLite's truncate fast path;
+# sqlite_sequence is reset so AUTOINCREMENT ids start over
+_SQL_CLEAR_HISTORY = """
+    BEGIN;
+    DELETE FROM test_cases;
+    DELETE FROM test_results;
+    DELETE FROM sqlite_sequence WHERE name IN ('test_cases', 'test_results');
+    COMMIT;
+    VACUUM;
+"""
+_TEST_CASE_COLUMNS = ("result_id", "service", "action", "status", "details", "execution_time_us")
+# Tables whose execution_time REAL column is migrated to execution_time_us
+_TIMED_TABLES = ("test_results", "test_cases")
+
+def bulk_insert(conn: sqlite3.Connection, table: str, cols, rows, batch: int = 500) -> int:
+    """Insert rows as multi-row INSERT ... VALUES (...),(...) statements inside a single transaction.
+    
+    Each statement carries up to batch rows, capped so the bound parameters stay
+    under _MAX_VARIABLES. Returns the number of rows inserted, summed from cursor.rowcount.
+    """
+    row_placeholder = f"({', '.join('?' * len(cols))})"
+    prefix = f"INSERT INTO {table}({', '.join(cols)}) VALUES "
+    batch = max(1, min(batch, _MAX_VARIABLES // len(cols)))
+    cursor = conn.cursor()
+    # Join the caller's transaction if one is open, otherwise run our own
+    owns_transaction = not conn.in_transaction
+    if owns_transaction:
+        cursor.execute("BEGIN")
+    
+    total = 0
+    it = iter(rows)
+    while True:
+        chunk = list(itertools.islice(it, batch))
+        if not chunk:
+            break
+        # Full chunks reuse the same SQL text, so only the tail statement is compiled twice
+        cursor.execute(prefix + ", ".join([row_placeholder] * len(chunk)),
+                       list(itertools.chain.from_iterable(chunk)))
+        total += cursor.rowcount
+    
+    if owns_transaction:
+        conn.commit()
+    return total
+
+def _rows_as_dicts(cursor: sqlite3.Cursor, batch: int = 1000) -> List[Dict]:
+    """Turn the rows of an executed query into dicts keyed by column name, fetching in batches"""
+    cols = [d[0] for d in cursor.description]
+    results = []
+    for rows in iter(lambda: cursor.fetchmany(batch), []):
+        results.extend(dict(zip(cols, row)) for row in rows)
+    return results
 
 class TestDatabase:
     """Database handler for test results and settings"""
     
+    # Set once the data directory has been created, so later instances skip the makedirs call
+    _dir_ready = False
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.db_path = os.path.join("data", "history.db")
         
         # Ensure directory exists
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        if not TestDatabase._dir_ready:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            TestDatabase._dir_ready = True
+        
+        # One long-lived connection shared by every method (GUI and worker threads),
+        # in autocommit mode; multi-statement writes open their own transaction
+        self._conn = self._connect()
+        self._lock = threading.RLock()
         
         # Initialize database
         self._init_db()
+        
+        # In-memory mirror of the settings table; get_setting reads only from here
+        self._settings: Dict[str, str] = self._load_settings()
+        
+        # Separate read-only connection for history queries, so GUI reads never
+        # wait on the writer lock; in WAL mode readers see the last committed data
+        self._ro_conn = self._connect_readonly()
+        self._ro_lock = threading.RLock()
+        
+        # Periodic PASSIVE checkpoints keep the WAL small between writes
+        self._closed = False
+        self._checkpoint_timer = None
+        self._schedule_checkpoint()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a history.db connection with the shared PRAGMAs applied"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None,
+                               cached_statements=256)
+        apply_perf_pragmas(conn)
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+    
+    def _connect_readonly(self) -> sqlite3.Connection:
+        """Open a read-only history.db connection for the history queries"""
+        uri = pathlib.Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False, isolation_level=None,
+                               cached_statements=256)
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-65536")
+        return conn
+    
+    @contextlib.contextmanager
+    def _transaction(self, mode: str = ""):
+        """Hold the connection lock and run the enclosed statements as one transaction.
+        
+        mode is passed to BEGIN (e.g. "IMMEDIATE" to take the write lock up front).
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute(f"BEGIN {mode}")
+            try:
+                yield cursor
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+    
+    def _schedule_checkpoint(self):
+        """Arm the background checkpoint timer"""
+        self._checkpoint_timer = threading.Timer(_CHECKPOINT_INTERVAL, self._periodic_checkpoint)
+        self._checkpoint_timer.daemon = True
+        self._checkpoint_timer.start()
+    
+    def _periodic_checkpoint(self):
+        """Copy committed WAL frames into the database without blocking readers or writers"""
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            except Exception as e:
+                self.logger.warning(f"WAL checkpoint failed: {e}")
+            self._schedule_checkpoint()
+    
+    def close(self):
+        """Close the shared database connections"""
+        with self._lock:
+            self._closed = True
+            if self._checkpoint_timer is not None:
+                self._checkpoint_timer.cancel()
+        with self._ro_lock:
+            try:
+                self._ro_conn.close()
+            except Exception as e:
+                self.logger.error(f"Error closing read-only database connection: {e}")
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception as e:
+                self.logger.error(f"Error closing database: {e}")
     
     def _init_db(self):
         """Initialize database tables if they don't exist"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            # Checkpoint in smaller steps so a commit never waits on a large WAL
+            self._conn.execute(f"PRAGMA wal_autocheckpoint={_WAL_AUTOCHECKPOINT_PAGES}")
             
-            # Settings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
-            ''')
-            
-            # Test results table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS test_results (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    file_name TEXT,
-                    file_size INTEGER,
-                    test_count INTEGER,
-                    send_status TEXT,
-                    overall_result TEXT,
-                    affects_wan BOOLEAN,
-                    affects_lan BOOLEAN,
-                    execution_time REAL,
-                    target_ip TEXT,
-                    target_username TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Test case details table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS test_cases (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    result_id INTEGER,
-                    service TEXT,
-                    action TEXT,
-                    status TEXT,
-                    details TEXT,
-                    execution_time REAL,
-                    FOREIGN KEY (result_id) REFERENCES test_results(id)
-                )
-            ''')
-            
-            # Connection log table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS connection_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ip_address TEXT,
-                    status TEXT,
-                    details TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
+            with self._transaction() as cursor:
+                self._create_tables(cursor)
             
         except Exception as e:
             self.logger.error(f"Database initialization error: {e}")
     
+    def _create_tables(self, cursor: sqlite3.Cursor):
+        """Create the history tables if they don't exist"""
+        # Settings table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        
+        # Test results table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS test_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_name TEXT,
+                file_size INTEGER,
+                test_count INTEGER,
+                send_status TEXT,
+                overall_result TEXT,
+                affects_wan BOOLEAN,
+                affects_lan BOOLEAN,
+                execution_time_us INTEGER,
+                target_ip TEXT,
+                target_username TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Test case details table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS test_cases (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                result_id INTEGER,
+                service TEXT,
+                action TEXT,
+                status TEXT,
+                details TEXT,
+                execution_time_us INTEGER,
+                FOREIGN KEY (result_id) REFERENCES test_results(id)
+            )
+        ''')
+        
+        # Connection log table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS connection_log (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ip_address TEXT,
+                status TEXT,
+                details TEXT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        self._migrate_execution_time(cursor)
+        
+        for name in _OBSOLETE_INDEXES:
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
+        
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        existing_indexes = {row[0] for row in cursor.fetchall()}
+        missing_indexes = [name for name in _INDEXES if name not in existing_indexes]
+        
+        if missing_indexes:
+            self.logger.info(f"Creating indexes: {', '.join(missing_indexes)}")
+            for name in missing_indexes:
+                cursor.execute(_INDEXES[name])
+            # Gather statistics once so the planner picks up the new indexes
+            cursor.execute("ANALYZE")
+    
+    def _migrate_execution_time(self, cursor: sqlite3.Cursor):
+        """One-time move of REAL execution_time seconds into INTEGER execution_time_us"""
+        for table in _TIMED_TABLES:
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = {row[1] for row in cursor.fetchall()}
+            if "execution_time_us" in columns:
+                continue
+            
+            self.logger.info(f"Migrating {table}.execution_time to integer microseconds")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN execution_time_us INTEGER")
+            # Old REAL values are cleared so they stop taking record space
+            cursor.execute(
+                f"UPDATE {table} SET execution_time_us = CAST(ROUND(execution_time * {_US_PER_SECOND}) AS INTEGER), "
+                "execution_time = NULL"
+            )
+    
     def save_setting(self, key: str, value: str) -> bool:
         """Save a setting to the database"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                (key, value)
-            )
-            
-            conn.commit()
-            conn.close()
+            with self._lock:
+                cursor = self._conn.cursor()
+                cursor.execute(_SQL_SAVE_SETTING, (key, value))
+                self._settings[key] = value
             return True
             
         except Exception as e:
             self.logger.error(f"Error saving setting {key}: {e}")
             return False
     
-    def get_setting(self, key: str, default: str = "") -> str:
-        """Get a setting from the database"""
+    def save_settings(self, settings: Dict[str, str]) -> bool:
+        """Save several settings in a single transaction"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT value FROM settings WHERE key = ?", (key,))
-            result = cursor.fetchone()
-            
-            conn.close()
-            
-            return result[0] if result else default
+            with self._transaction() as cursor:
+                cursor.executemany(_SQL_SAVE_SETTING, list(settings.items()))
+            self._settings.update(settings)
+            return True
             
         except Exception as e:
-            self.logger.error(f"Error retrieving setting {key}: {e}")
-            return default
+            self.logger.error(f"Error saving settings: {e}")
+            return False
+    
+    def _load_settings(self) -> Dict[str, str]:
+        """Read the whole settings table into a dict"""
+        try:
+            with self._lock:
+                return dict(self._conn.execute(_SQL_ALL_SETTINGS))
+        except Exception as e:
+            self.logger.error(f"Error loading settings: {e}")
+            return {}
+    
+    def get_setting(self, key: str, default: str = "") -> str:
+        """Get a setting from the in-memory settings mirror"""
+        return self._settings.get(key, default)
     
     def log_connection(self, ip_address: str, status: str, details: str) -> bool:
         """Log a connection attempt"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "INSERT INTO connection_log (ip_address, status, details) VALUES (?, ?, ?)",
-                (ip_address, status, details)
-            )
-            
-            conn.commit()
-            conn.close()
+            with self._lock:
+                cursor = self._conn.cursor()
+                cursor.execute(_SQL_LOG_CONNECTION, (ip_address, status, details))
             return True
             
         except Exception as e:
             self.logger.error(f"Error logging connection: {e}")
             return False
     
-    def save_test_file_result(self, **kwargs) -> int:
-        """Save test file execution results"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Insert the test result
-            cursor.execute(
-                """
-                INSERT INTO test_results (
-                    file_name, file_size, test_count, send_status, overall_result,
-                    affects_wan, affects_lan, execution_time, target_ip, target_username
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    kwargs.get("file_name", ""),
-                    kwargs.get("file_size", 0),
-                    kwargs.get("test_count", 0),
-                    kwargs.get("send_status", ""),
-                    kwargs.get("overall_result", ""),
-                    kwargs.get("affects_wan", False),
-                    kwargs.get("affects_lan", False),
-                    kwargs.get("execution_time", 0),
-                    kwargs.get("target_ip", ""),
-                    kwargs.get("target_username", "")
-                )
+    def _insert_result(self, cursor: sqlite3.Cursor, header: Dict) -> int:
+        """Insert one test_results row from header fields and return its id"""
+        cursor.execute(
+            _SQL_INSERT_RESULT,
+            (
+                header.get("file_name", ""),
+                header.get("file_size", 0),
+                header.get("test_count", 0),
+                header.get("send_status", ""),
+                header.get("overall_result", ""),
+                header.get("affects_wan", False),
+                header.get("affects_lan", False),
+                _to_us(header.get("execution_time", 0)),
+                header.get("target_ip", ""),
+                header.get("target_username", "")
             )
+        )
+        
+        # Get the inserted ID and ensure it's an int
+        result_id = cursor.lastrowid
+        return result_id if result_id is not None else -1
+    
+    def _insert_test_cases(self, cursor: sqlite3.Cursor, result_id: int, test_cases: List[Dict],
+                           file_name: Optional[str]) -> int:
+        """Insert test_cases rows for result_id inside the caller's transaction.
+        
+        Cases with service "unknown" take service/action from file_name. Returns the row count.
+        """
+        if file_name is not None:
+            # Extract service and action from filename if test case has "unknown" service
+            base_name = os.path.splitext(file_name)[0]
+            parts = base_name.split('_')
+            default_service = parts[0] if parts else "unknown"
+            default_action = '_'.join(parts[1:]) if len(parts) > 1 else ""
+            
+            # Chi tiết cho test case đã sửa, tính một lần cho cả batch
+            pass_details = f"{default_service} {default_action} completed successfully"
+            fail_details = f"{default_service} {default_action} failed"
+            
+            # Update test cases with unknown service
+            patched = 0
+            for test in test_cases:
+                if test.get("service") == "unknown":
+                    test["service"] = default_service
+                    test["action"] = default_action
+                    test["details"] = pass_details if test.get("status", "pass") == "pass" else fail_details
+                    patched += 1
+            
+            if patched:
+                self.logger.info("Patched %d unknown-service rows from %s with %s.%s",
+                                 patched, file_name, default_service, default_action)
+        
+        rows = [
+            (
+                result_id,
+                test.get("service", "unknown"),
+                test.get("action", ""),
+                test.get("status", "unknown"),
+                test.get("details", ""),
+                _to_us(test.get("execution_time", 0))
+            )
+            for test in test_cases
+        ]
+        
+        # Insert test cases as multi-row VALUES statements in the open transaction
+        return bulk_insert(self._conn, "test_cases", _TEST_CASE_COLUMNS, rows)
+    
+    def save_test_run(self, header: Dict, cases: List[Dict]) -> int:
+        """Save a test file result and its test cases in one transaction.
+        
+        header holds the save_test_file_result fields. Returns the new result id, or -1 on error.
+        """
+        try:
+            with self._transaction("IMMEDIATE") as cursor:
+                result_id = self._insert_result(cursor, header)
+                count = self._insert_test_cases(cursor, result_id, cases, header.get("file_name", ""))
             
-            # Get the inserted ID and ensure it's an int
-            result_id = cursor.lastrowid
-            final_id = result_id if result_id is not None else -1
-            
-            conn.commit()
-            conn.close()
+            self.logger.info("Saved %d test cases for result %d", count, result_id)
+            return result_id
             
-            return final_id
+        except Exception as e:
+            self.logger.error(f"Error saving test run: {e}")
+            return -1
+    
+    def save_test_file_result(self, **kwargs) -> int:
+        """Save test file execution results"""
+        try:
+            with self._lock:
+                return self._insert_result(self._conn.cursor(), kwargs)
             
         except Exception as e:
             self.logger.error(f"Error saving test result: {e}")
             return -1
     
-    def save_test_case_results(self, result_id: int, test_cases: List[Dict]) -> bool:
-        """Save individual test case results with more detailed information"""
+    def save_test_case_results(self, result_id: int, test_cases: List[Dict], file_name: str = "") -> bool:
+        """Save individual test case results with more detailed information.
+        
+        file_name is the result's file name; when omitted it is looked up by result_id.
+        result_id must be an existing test_results row (foreign keys are enforced);
+        for a missing one nothing is saved and False is returned.
+        """
+        # Nothing to save: return before taking the lock or touching the database
+        if not test_cases:
+            return True
+        
         try:
-            if not test_cases:
-                return True
-                
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get file name for this result ID
-            cursor.execute("SELECT file_name FROM test_results WHERE id = ?", (result_id,))
-            row = cursor.fetchone()
-            if row:
-                file_name = row[0]
-                # Extract service and action from filename if test case has "unknown" service
-                base_name = os.path.splitext(file_name)[0]
-                parts = base_name.split('_')
-                default_service = parts[0] if parts else "unknown"
-                default_action = '_'.join(parts[1:]) if len(parts) > 1 else ""
-                
-                # Log extracted information
-                self.logger.info(f"Extracted from filename {file_name}: service={default_service}, action={default_action}")
-                
-                # Update test cases with unknown service
-                for test in test_cases:
-                    if test.get("service") == "unknown":
-                        test["service"] = default_service
-                        test["action"] = default_action
-                        # Cập nhật thông báo chi tiết với service và action mới
-                        status = test.get("status", "pass")
-                        status_text = "completed successfully" if status == "pass" else "failed"
-                        test["details"] = f"{default_service} {default_action} {status_text}"
-                        
-                        self.logger.info(f"Updated test case: {test['service']}.{test['action']} - {test['details']}")
-            
-            # Insert test cases
-            for test in test_cases:
-                cursor.execute(
-                    """
-                    INSERT INTO test_cases (
-                        result_id, service, action, status, details, execution_time
-                    ) VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        result_id,
-                        test.get("service", "unknown"),
-                        test.get("action", ""),
-                        test.get("status", "unknown"),
-                        test.get("details", ""),
-                        test.get("execution_time", 0)
-                    )
-                )
-            
-            # Kiểm tra số bản ghi đã được thêm vào
-            cursor.execute("SELECT COUNT(*) FROM test_cases WHERE result_id = ?", (result_id,))
-            count = cursor.fetchone()[0]
-            self.logger.info(f"Total {count} test cases saved for result ID {result_id}")
-            
-            conn.commit()
-            conn.close()
+            with self._transaction("IMMEDIATE") as cursor:
+                if not file_name:
+                    # Get file name for this result ID
+                    cursor.execute(_SQL_RESULT_FILE_NAME, (result_id,))
+                    row = cursor.fetchone()
+                    file_name = row[0] if row else None
+                count = self._insert_test_cases(cursor, result_id, test_cases, file_name)
+            
+            self.logger.info("Saved %d test cases for result %d", count, result_id)
             return True
             
+        except sqlite3.IntegrityError as e:
+            # The whole batch is rolled back
+            self.logger.error(f"Test case results not saved, result {result_id} does not exist: {e}")
+            return False
         except Exception as e:
             self.logger.error(f"Error saving test case results: {e}")
             return False
@@ -246,103 +512,86 @@ class TestDatabase:
     def get_recent_history(self, limit: int = 100) -> List[Dict]:
         """Get recent test history"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                """
-                SELECT * FROM test_results 
-                ORDER BY timestamp DESC 
-                LIMIT ?
-                """,
-                (limit,)
-            )
-            
-            results = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-            
-            return results
+            with self._ro_lock:
+                cursor = self._ro_conn.cursor()
+                cursor.execute(_SQL_RECENT_HISTORY, (limit,))
+                
+                return _rows_as_dicts(cursor)
             
         except Exception as e:
             self.logger.error(f"Error retrieving history: {e}")
             return []
     
-    def get_filtered_history(self, where_clause: str = "", limit: int = 100) -> List[Dict]:
-        """Get filtered test history"""
+    def get_filtered_history(self, filters: Optional[Dict[str, Any]] = None, limit: int = 100) -> List[Dict]:
+        """Get test history matching column=value filters"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-            cursor = conn.cursor()
-            
-            query = f"SELECT * FROM test_results {where_clause} ORDER BY timestamp DESC LIMIT {limit}"
-            cursor.execute(query)
-            
-            results = [dict(row) for row in cursor.fetchall()]
-            conn.close()
-            
-            return results
+            clauses = []
+            params = []
+            # Sorted so the same filter keys always produce the same (cached) SQL text
+            for col, val in sorted((filters or {}).items()):
+                if col in _RESULT_COLUMN_ALIASES:
+                    col, convert = _RESULT_COLUMN_ALIASES[col]
+                    val = convert(val)
+                if col not in _RESULT_COLUMNS:
+                    raise ValueError(f"Unknown filter column: {col}")
+                clauses.append(f"{col} = ?")
+                params.append(val)
+            params.append(limit)
+            
+            where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+            query = f"{_SQL_RESULT_SELECT} {where}ORDER BY timestamp DESC LIMIT ?"
+            
+            with self._ro_lock:
+                cursor = self._ro_conn.cursor()
+                cursor.execute(query, params)
+                
+                return _rows_as_dicts(cursor)
             
         except Exception as e:
             self.logger.error(f"Error retrieving filtered history: {e}")
             return []
     
-    def get_test_details(self, file_name, timestamp=None):
-        """Get test case details for a specific file and timestamp"""
+    def get_test_details(self, file_name, timestamp=None) -> List[Dict]:
+        """Get test case details for a specific file and timestamp.
+        
+        All rows are fetched under the read lock, so no read transaction stays open
+        while the caller uses them. Database errors are logged and re-raised, so an
+        empty list always means "no test cases".
+        """
+        if timestamp:
+            query, params = _SQL_TEST_DETAILS_AT, (file_name, f"{timestamp}%")
+        else:
+            query, params = _SQL_TEST_DETAILS_ALL, (file_name,)
+        
         try:
-            # Sử dụng self.db_path thay vì hardcode đường dẫn
-            connection = sqlite3.connect(self.db_path)
-            cursor = connection.cursor()
-            
-            query = """
-            SELECT tc.service, tc.action, tc.status, tc.details, tc.execution_time
-            FROM test_cases tc
-            JOIN test_results tr ON tc.result_id = tr.id
-            WHERE tr.file_name = ?
-            """
-            
-            params = [file_name]
-            
-            if timestamp:
-                query += " AND tr.timestamp LIKE ?"
-                params.append(f"{timestamp}%")
-                    
-            query += " ORDER BY tc.id"
-            
-            cursor.execute(query, params)
-            results = cursor.fetchall()
-            
-            details = []
-            for row in results:
-                details.append({
-                    "service": row[0],
-                    "action": row[1],
-                    "status": row[2],
-                    "details": row[3],
-                    "execution_time": row[4]
-                })
-                    
-            connection.close()
-            return details
-                
-        except Exception as e:
+            with self._ro_lock:
+                cursor = self._ro_conn.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+        except sqlite3.Error as e:
             self.logger.error(f"Error getting test details: {e}")
-            return []
+            raise
+        
+        return [
+            {
+                "service": service,
+                "action": action,
+                "status": status,
+                "details": details,
+                "execution_time": execution_time_us / _US_PER_SECOND if execution_time_us is not None else None
+            }
+            for service, action, status, details, execution_time_us in rows
+        ]
     
     def clear_history(self) -> bool:
         """Clear all history data"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("DELETE FROM test_cases")
-            cursor.execute("DELETE FROM test_results")
-            
-            conn.commit()
-            conn.close()
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Error clearing history: {e}")
-            return False
\ No newline at end of file
+        with self._lock:
+            try:
+                self._conn.executescript(_SQL_CLEAR_HISTORY)
+                return True
+                
+            except Exception as e:
+                if self._conn.in_transaction:
+                    self._conn.rollback()
+                self.logger.error(f"Error clearing history: {e}")
+                return False
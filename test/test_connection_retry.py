@@ -0,0 +1,111 @@
+# Tests for the SSHConnection.execute_command retry policy
+import os
+import socket
+import sys
+
+import pytest
+
+pytest.importorskip("paramiko")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import network.connection as connection  # noqa: E402
+from network.connection import SSHConnection  # noqa: E402
+
+
+class TimingOutFile:
+    """ChannelFile whose read() raises a bare socket.timeout like paramiko's"""
+
+    def read(self):
+        raise socket.timeout()
+
+
+class FakeTransport:
+    def is_active(self):
+        return True
+
+    def is_authenticated(self):
+        return True
+
+
+class FakeClient:
+    def __init__(self, exec_errors=0):
+        self.exec_errors = exec_errors
+        self.exec_calls = 0
+
+    def get_transport(self):
+        return FakeTransport()
+
+    def exec_command(self, command, timeout=None):
+        self.exec_calls += 1
+        if self.exec_errors:
+            self.exec_errors -= 1
+            raise socket.timeout()
+        return None, TimingOutFile(), TimingOutFile()
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    monkeypatch.setattr(connection.time, "sleep", lambda delay: None)
+    conn = SSHConnection()
+    conn.connected = True
+    conn.reconnects = 0
+
+    def reconnect():
+        conn.reconnects += 1
+        conn.connected = True
+        return True
+
+    conn._reconnect = reconnect
+    return conn
+
+
+def test_read_timeout_is_not_rerun_by_default(conn):
+    conn.client = FakeClient()
+
+    success, _, stderr = conn.execute_command_bytes("reboot", use_shell=False)
+
+    assert not success
+    assert stderr  # bare socket.timeout still reports a reason
+    assert conn.client.exec_calls == 1
+    assert conn.reconnects == 0
+
+
+def test_read_timeout_is_retried_when_idempotent(conn):
+    conn.client = FakeClient()
+
+    success, _, _ = conn.execute_command_bytes("cat /etc/banner", use_shell=False, idempotent=True)
+
+    assert not success
+    assert conn.client.exec_calls == 3
+    assert conn.reconnects == 2
+
+
+def test_timeout_before_channel_opens_is_retried(conn):
+    conn.client = FakeClient(exec_errors=1)
+
+    conn.execute_command_bytes("reboot", use_shell=False)
+
+    assert conn.client.exec_calls == 2
+    assert conn.reconnects == 1
+
+
+def test_dead_transport_reconnects_before_running(conn):
+    conn.client = FakeClient(exec_errors=1)
+    conn.connected = False
+
+    conn.execute_command_bytes("reboot", use_shell=False)
+
+    assert conn.reconnects >= 1
+    assert conn.client.exec_calls >= 1
+
+
+def test_dead_transport_without_credentials_reports_not_connected():
+    conn = SSHConnection()
+    conn.client = FakeClient()
+
+    success, _, stderr = conn.execute_command_bytes("uptime", use_shell=False)
+
+    assert not success
+    assert stderr == b"Not connected"
+    assert conn.client.exec_calls == 0
@@ -0,0 +1,105 @@
+# Tests for SSHConnection's handling of devices without an SFTP subsystem
+import os
+import sys
+
+import pytest
+
+paramiko = pytest.importorskip("paramiko")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from network.connection import SSHConnection  # noqa: E402
+
+
+class NoSftpClient:
+    """SSH client whose SFTP subsystem request is always refused"""
+
+    def __init__(self):
+        self.open_sftp_calls = 0
+
+    def open_sftp(self):
+        self.open_sftp_calls += 1
+        raise paramiko.SSHException("subsystem request failed")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = SSHConnection()
+    conn.client = NoSftpClient()
+    conn.connected = True
+    conn.commands = []
+
+    def execute_command_bytes(command, timeout=30, use_shell=None, idempotent=False):
+        conn.commands.append(command)
+        return True, b"42\n", b""
+
+    monkeypatch.setattr(conn, "execute_command_bytes", execute_command_bytes)
+    return conn
+
+
+def test_refused_sftp_is_only_requested_once(conn):
+    assert conn.get_file_size("/tmp/a") == 42
+    assert conn.file_exists("/tmp/b")
+
+    assert conn.client.open_sftp_calls == 1
+    assert len(conn.commands) == 2
+
+
+def test_disconnect_forgets_refused_sftp(conn):
+    conn.get_file_size("/tmp/a")
+    client = conn.client
+    conn.disconnect()
+    conn.client = client
+
+    conn.get_file_size("/tmp/a")
+
+    assert client.open_sftp_calls == 2
+
+
+def test_upload_goes_straight_to_base64_once_sftp_refused(conn, monkeypatch, tmp_path):
+    local = tmp_path / "case.json"
+    local.write_text("{}")
+    uploads = []
+    monkeypatch.setattr(conn, "upload_file_via_base64", lambda l, r: uploads.append(r) or True)
+    monkeypatch.setattr(conn, "_get_libssh2", lambda: pytest.fail("libssh2 tried after SFTP refusal"))
+    conn.get_file_size("/tmp/a")
+
+    assert conn.upload_file_via_ssh_exec(str(local), "/root/config/case.json")
+    assert conn.upload_file_via_ssh_exec(str(local), "/root/config/case2.json")
+
+    assert uploads == ["/root/config/case.json", "/root/config/case2.json"]
+    assert conn.client.open_sftp_calls == 1
+
+
+def test_batch_upload_skips_sftp_workers_once_refused(conn, monkeypatch, tmp_path):
+    local = tmp_path / "case.json"
+    local.write_text("{}")
+    uploads = []
+    monkeypatch.setattr(conn, "ensure_remote_directory", lambda d: True)
+    monkeypatch.setattr(conn, "upload_file_via_base64", lambda l, r: uploads.append(r) or True)
+    conn.get_file_size("/tmp/a")
+
+    assert conn.upload_files([(str(local), "/root/config/.staging/case.json")]) == [True]
+
+    assert uploads == ["/root/config/.staging/case.json"]
+    assert conn.client.open_sftp_calls == 1
+
+
+def test_batch_upload_falls_back_to_one_pscp_batch(conn, monkeypatch, tmp_path):
+    pairs = []
+    for name in ("a.json", "b.json"):
+        local = tmp_path / name
+        local.write_text("{}")
+        pairs.append((str(local), f"/root/config/{name}"))
+    batches = []
+    monkeypatch.setattr(conn, "ensure_remote_directory", lambda d: True)
+    monkeypatch.setattr(conn, "upload_file_via_ssh_exec", lambda l, r: False)
+    monkeypatch.setattr(conn, "upload_file_via_pscp", lambda l, r: pytest.fail("per-file PSCP"))
+    monkeypatch.setattr(conn, "upload_files_via_pscp", lambda p, w: batches.append(p) or [True] * len(p))
+
+    assert conn.upload_files(pairs) == [True, True]
+
+    assert batches == [pairs]
@@ -0,0 +1,142 @@
+# Tests for the persistent shell used by SSHConnection
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("paramiko")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from network.connection import SSHConnection, _SHELL_SENTINEL  # noqa: E402
+
+BANNER = b"  _______  OpenWrt banner\n -----------------------\n"
+
+
+class FakeShellChannel:
+    """Shell channel that prints a login banner before answering framed commands"""
+
+    def __init__(self):
+        self.closed = False
+        self.eof_received = False
+        self._stdout = bytearray(BANNER)
+        self._stderr = bytearray()
+        self.commands = []
+
+    def invoke_shell(self):
+        pass
+
+    def settimeout(self, timeout):
+        pass
+
+    def gettimeout(self):
+        return 1
+
+    def exit_status_ready(self):
+        return False
+
+    def sendall(self, data):
+        text = data.decode("utf-8")
+        command = text[2:text.index("\n)")]
+        self.commands.append(command)
+        if command.startswith("echo "):
+            self._stdout += command[5:].strip("'").encode() + b"\n"
+        self._stdout += f"__RC_0__{_SHELL_SENTINEL}\n".encode()
+        self._stderr += f"{_SHELL_SENTINEL}\n".encode()
+
+    def recv_ready(self):
+        return bool(self._stdout)
+
+    def recv_stderr_ready(self):
+        return bool(self._stderr)
+
+    def recv(self, size):
+        data = bytes(self._stdout[:size])
+        del self._stdout[:size]
+        return data
+
+    def recv_stderr(self, size):
+        data = bytes(self._stderr[:size])
+        del self._stderr[:size]
+        return data
+
+    def close(self):
+        self.closed = True
+
+
+class NoisyStderrChannel(FakeShellChannel):
+    """Shell whose command floods stderr; like a full flow-control window, no more
+    stdout arrives until the pending stderr has been read"""
+
+    def sendall(self, data):
+        super().sendall(data)
+        if self.commands[-1] != "true":
+            self._stderr[:0] = b"warning: noisy\n" * 10000
+
+    def recv_ready(self):
+        return bool(self._stdout) and not self._stderr
+
+    def recv(self, size):
+        if self._stderr:
+            return b""
+        return super().recv(size)
+
+
+class FakeTransport:
+    def __init__(self, channel):
+        self.channel = channel
+
+    def is_active(self):
+        return True
+
+    def is_authenticated(self):
+        return True
+
+    def open_session(self):
+        return self.channel
+
+
+class FakeClient:
+    def __init__(self, transport):
+        self.transport = transport
+
+    def get_transport(self):
+        return self.transport
+
+
+def _connected(channel):
+    conn = SSHConnection()
+    conn.client = FakeClient(FakeTransport(channel))
+    conn.connected = True
+    return conn
+
+
+def test_banner_is_not_returned_as_first_command_output():
+    channel = FakeShellChannel()
+    conn = _connected(channel)
+
+    success, stdout, stderr = conn.execute_command("echo 'exists'")
+
+    assert success
+    assert stdout.strip() == "exists"
+    assert stderr == ""
+    # Warm-up round-trip ran before the real command
+    assert channel.commands == ["true", "echo 'exists'"]
+
+
+def test_ping_succeeds_after_banner():
+    conn = _connected(FakeShellChannel())
+
+    assert conn.ping(max_age=0)
+    assert conn.connected
+
+
+def test_heavy_stderr_does_not_stall_stdout():
+    channel = NoisyStderrChannel()
+    conn = _connected(channel)
+
+    success, stdout, stderr = conn.execute_command("echo 'done'")
+
+    assert success
+    assert stdout.strip() == "done"
+    assert stderr.count("warning: noisy") == 10000
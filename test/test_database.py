@@ -0,0 +1,64 @@
+# Tests for TestDatabase (history.db in a temporary working directory)
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from storage import database as storage_database  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "data").mkdir()
+    database = storage_database.TestDatabase()
+    yield database
+    database.close()
+
+
+def _header(file_name, execution_time):
+    return {
+        "file_name": file_name, "file_size": 10, "test_count": 1, "send_status": "Sent",
+        "overall_result": "Pass", "execution_time": execution_time,
+    }
+
+
+def test_filtered_history_accepts_execution_time_in_seconds(database):
+    database.save_test_run(_header("a.json", 1.5), [])
+    database.save_test_run(_header("b.json", 2.0), [])
+
+    rows = database.get_filtered_history({"execution_time": 1.5})
+
+    assert [row["file_name"] for row in rows] == ["a.json"]
+    assert rows[0]["execution_time"] == 1.5
+
+
+def test_test_details_are_returned_as_a_list(database):
+    result_id = database.save_test_run(_header("a.json", 1.0), [
+        {"service": "wan", "action": "create", "status": "pass", "details": "", "execution_time": 0.25},
+    ])
+    assert result_id > 0
+
+    details = database.get_test_details("a.json")
+
+    assert details == [
+        {"service": "wan", "action": "create", "status": "pass", "details": "", "execution_time": 0.25},
+    ]
+
+
+def test_test_details_errors_are_raised(database):
+    database._ro_conn.close()
+
+    with pytest.raises(Exception):
+        database.get_test_details("a.json")
+
+
+def test_test_cases_for_missing_result_are_not_saved(database, caplog):
+    cases = [{"service": "wan", "action": "create", "status": "pass", "details": "", "execution_time": 0.1}]
+
+    assert not database.save_test_case_results(12345, cases, "a.json")
+
+    assert "result 12345 does not exist" in caplog.text
+    assert database._conn.execute("SELECT COUNT(*) FROM test_cases").fetchone()[0] == 0